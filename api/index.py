@@ -783,31 +783,19 @@ def process_cardlists(cardlists: List[Dict], include_game_changers: bool = True,
     return cards
 
 
-def select_weighted_type(type_weights: Dict[str, float]) -> str:
-    """Select a card type based on weighted distribution"""
-    if not type_weights:
-        return "Creature"
-    
+def build_type_cum_weights(type_weights: Dict[str, float]) -> Tuple[List[str], List[float]]:
+    """Build (types, cumulative weights) for weighted type selection, skipping zero weights"""
     types = []
-    weights = []
+    cum_weights = []
     cumulative = 0
     
-    for card_type, weight in type_weights.items():
+    for card_type, weight in (type_weights or {}).items():
         if weight > 0:
             types.append(card_type)
             cumulative += weight
-            weights.append(cumulative)
-    
-    if not types:
-        return "Creature"
-    
-    rand = random.random()
+            cum_weights.append(cumulative)
     
-    for i, threshold in enumerate(weights):
-        if rand <= threshold:
-            return types[i]
-    
-    return types[-1]
+    return types, cum_weights
 
 
 def select_cards_by_type(cards: List[Dict], card_type: str, count: int, used_cards: set) -> List[str]:
@@ -840,8 +828,14 @@ def select_weighted_cards(cards: List[Dict], count: int, type_weights: Dict[str,
     """Select cards using weighted type distribution from average deck"""
     selected = []
     
-    for _ in range(count):
-        card_type = select_weighted_type(type_weights)
+    # Build cumulative weights once and draw every slot's type in one call
+    types, cum_weights = build_type_cum_weights(type_weights)
+    if types:
+        card_types = random.choices(types, cum_weights=cum_weights, k=count)
+    else:
+        card_types = ["Creature"] * count
+    
+    for card_type in card_types:
         card_list = select_cards_by_type(cards, card_type, 1, used_cards)
         
         if card_list:
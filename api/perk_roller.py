@@ -7,9 +7,36 @@ to ensure fair but variable perk quality across players.
 """
 
 import json
+import logging
+import math
 import os
+import threading
 import time
 import random
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from itertools import chain, repeat
+from operator import itemgetter
+
+# orjson parses perks.json noticeably faster; stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+PERKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'docs', 'data', 'perks.json')
+
+# Required fields of every perk sent to clients
+_PERK_REQUIRED = itemgetter('id', 'name', 'rarity')
+
+# Parsed perks.json and the roller built from it, shared across requests and
+# rebuilt only when the file's mtime changes
+_PERKS_DATA_CACHE = None
+_PERKS_MTIME = None
+_ROLLER = None
+_CACHE_LOCK = threading.Lock()
 
 # === LUCK SYSTEM CONFIGURATION ===
 # These constants control how "fair" vs "random" the perk distribution is
@@ -33,10 +60,154 @@ LUCK_MAX_MULTIPLIER = 2.0   # Maximum: 200% of expected value (prevents god-tier
 #   rare:      44/17 = 2.59 (159% more valuable than common)
 #   mythic:    44/8  = 5.50 (450% more valuable than common)
 
+# Rarity weights used when perks.json doesn't define rarityWeights
+DEFAULT_RARITY_WEIGHTS = {
+    'common': 44,
+    'uncommon': 29,
+    'rare': 17,
+    'mythic': 8
+}
+
+
+def _build_alias(weights):
+    """
+    Build a Vose alias table for O(1) weighted sampling.
+    
+    Args:
+        weights: List of non-negative weights
+    
+    Returns:
+        tuple: (prob, alias) lists, both the same length as weights
+    """
+    n = len(weights)
+    total = float(sum(weights))
+    if total <= 0:
+        # Degenerate weights - fall back to uniform sampling
+        return [1.0] * n, list(range(n))
+    
+    scaled = [w * n / total for w in weights]
+    prob = [1.0] * n
+    alias = list(range(n))
+    
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = (scaled[l] + scaled[s]) - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+    
+    # Whatever is left over is 1.0 up to floating point error
+    return prob, alias
+
+
+def _alias_pick(table, rng=random):
+    """
+    Draw one item from an alias table built by _build_alias.
+    
+    Args:
+        table: (prob, alias, items) tuple
+        rng: Random source (random.Random instance or the random module)
+    
+    Returns:
+        The selected item
+    """
+    prob, alias, items = table
+    i = rng.randrange(len(items))
+    return items[i] if rng.random() < prob[i] else items[alias[i]]
+
+
+def _alias_sample(table, k, rng=random):
+    """
+    Draw k items (with replacement) from an alias table in one batch.
+    
+    Args:
+        table: (prob, alias, items) tuple
+        k: Number of draws
+        rng: Random source (random.Random instance or the random module)
+    
+    Returns:
+        list: k selected items
+    """
+    prob, alias, items = table
+    n = len(items)
+    randrange = rng.randrange
+    rand = rng.random
+    picks = [randrange(n) for _ in range(k)]
+    return [items[i] if rand() < prob[i] else items[alias[i]] for i in picks]
+
+
+def _load_perks_file(perks_path=PERKS_PATH):
+    """Read and parse perks.json, falling back to an empty perk list if missing"""
+    logger.debug("🎲 Looking for perks.json at: %s", perks_path)
+    
+    try:
+        with open(perks_path, 'rb') as f:
+            raw = f.read()
+        perks_data = orjson.loads(raw) if orjson is not None else json.loads(raw.decode('utf-8'))
+        logger.info("🎲 Loaded perks.json successfully, version: %s", perks_data.get('version', 'unknown'))
+        return perks_data
+    except FileNotFoundError:
+        logger.warning("⚠️ perks.json not found at %s, using fallback", perks_path)
+        return {
+            'rarityWeights': {'common': 55, 'uncommon': 30, 'rare': 12, 'mythic': 3},
+            'perks': []
+        }
+    except Exception as e:
+        logger.error("❌ Error loading perks.json: %s", e)
+        raise
+
+
+def _perks_mtime():
+    """Get perks.json's modification time (None if it's missing)"""
+    try:
+        return os.stat(PERKS_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _get_perks_data():
+    """Get parsed perks.json, reloading it only if the file has changed"""
+    global _PERKS_DATA_CACHE, _PERKS_MTIME
+    mtime = _perks_mtime()
+    if _PERKS_DATA_CACHE is None or mtime != _PERKS_MTIME:
+        with _CACHE_LOCK:
+            if _PERKS_DATA_CACHE is None or mtime != _PERKS_MTIME:
+                _PERKS_DATA_CACHE = _load_perks_file()
+                _PERKS_MTIME = mtime
+    return _PERKS_DATA_CACHE
+
+
+def _get_roller():
+    """Get the shared PerkRoller (its tables only depend on perks.json, not the session)"""
+    global _ROLLER
+    perks_data = _get_perks_data()
+    roller = _ROLLER
+    if roller is None or roller.perks_data is not perks_data:
+        with _CACHE_LOCK:
+            if _ROLLER is None or _ROLLER.perks_data is not perks_data:
+                _ROLLER = PerkRoller(perks_data)
+            roller = _ROLLER
+    return roller
+
 
 class PerkRoller:
     """Handles perk rolling logic with luck-based distribution and type-based deduplication"""
     
+    __slots__ = (
+        'perks_data', 'rarity_values', 'expected_value_per_perk',
+        '_weights', '_rarities', '_rarities_sorted', '_rarest_first', '_total_weight', '_rarity_prob',
+        '_pct_banner', '_all_perks', '_perks_by_id', '_perks_by_rarity', '_rarity_alias', '_perk_alias',
+        '_any_perk_alias', '_perk_type_cache', '_typed_by_rarity', '_perk_values',
+        '_composition_cache', '_luck_cache', '_output_perks'
+    )
+    
     def __init__(self, perks_data=None):
         """
         Initialize PerkRoller with perks data
@@ -48,143 +219,212 @@ class PerkRoller:
         if self.perks_data is None:
             self.perks_data = self._load_perks_data()
         
+        # Resolve rarity weights once (with standard 44/29/17/8 fallback)
+        self._weights = dict(self.perks_data.get('rarityWeights') or DEFAULT_RARITY_WEIGHTS)
+        self._rarities = list(self._weights.keys())
+        self._total_weight = sum(self._weights.values())
+        self._rarity_prob = {
+            rarity: weight / self._total_weight
+            for rarity, weight in self._weights.items()
+        }
+        # Most common first (session allocation order); fill order is the reverse
+        self._rarities_sorted = sorted(self._rarities, key=lambda r: self._weights[r], reverse=True)
+        self._rarest_first = sorted(range(len(self._rarities)), key=lambda i: self._weights[self._rarities[i]])
+        
+        # Expected rarity split never changes, so format it once for session logging
+        self._pct_banner = "\n".join(
+            f"   {rarity}: {prob * 100:.1f}%" for rarity, prob in self._rarity_prob.items()
+        )
+        
         # Calculate rarity values based on inverse probability
-        self.rarity_values = self._calculate_rarity_values()
-        self.expected_value_per_perk = self._calculate_expected_value_per_perk()
+        self.rarity_values, self.expected_value_per_perk = self._precompute_rarity()
+        
+        # Build sampling tables once - perks data is immutable after load
+        self._build_sampling_tables()
         
-        print(f"🎲 Perk roller initialized:")
-        print(f"   Rarity values: {self.rarity_values}")
-        print(f"   Expected value per perk: {self.expected_value_per_perk:.2f}")
+        logger.debug("🎲 Perk roller initialized: rarity values %s, expected value per perk %.2f",
+                     self.rarity_values, self.expected_value_per_perk)
     
-    def _calculate_rarity_values(self):
+    def _precompute_rarity(self):
         """
-        Calculate value for each rarity tier based on inverse probability.
-        Rarer perks are worth more.
+        Calculate each rarity tier's value and the expected value of a single perk.
+        
+        Values are inverse probability (rarer perks are worth more, common = 1.0
+        baseline); the expected value is the probability-weighted average of them.
         
         Returns:
-            dict: {rarity: value} where common = 1.0 baseline
+            tuple: ({rarity: value}, expected value - e.g. 1.80 for standard weights)
         """
-        weights = self.perks_data.get('rarityWeights', {
-            'common': 44,
-            'uncommon': 29,
-            'rare': 17,
-            'mythic': 8
-        })
-        
         # Use common as baseline (value = 1.0)
-        common_weight = weights.get('common', 44)
+        common_weight = self._weights.get('common', DEFAULT_RARITY_WEIGHTS['common'])
         
-        return {
-            rarity: common_weight / weight
-            for rarity, weight in weights.items()
-        }
+        rarity_values = {}
+        expected_value = 0.0
+        for rarity, weight in self._weights.items():
+            value = common_weight / weight
+            rarity_values[rarity] = value
+            expected_value += self._rarity_prob[rarity] * value
+        
+        return rarity_values, expected_value
     
-    def _calculate_expected_value_per_perk(self):
+    def _build_sampling_tables(self):
         """
-        Calculate the expected value of a single perk based on rarity distribution.
-        This is the weighted average value across all rarities.
+        Flatten perks and build alias tables for rarity and per-rarity perk selection.
         
-        Returns:
-            float: Expected value (e.g., 1.64 for standard weights)
+        Perks within a rarity are weighted by their optional weightMultiplier (default 1.0).
         """
-        weights = self.perks_data.get('rarityWeights', {
-            'common': 44,
-            'uncommon': 29,
-            'rare': 17,
-            'mythic': 8
-        })
-        
-        total_weight = sum(weights.values())
-        
-        # Weighted average: sum(probability * value) for each rarity
-        expected_value = sum(
-            (weight / total_weight) * self.rarity_values[rarity]
-            for rarity, weight in weights.items()
-        )
+        # Get all perks (handle both V1 and V2 format)
+        if 'perkTypes' in self.perks_data:
+            # V2 format - flatten perkTypes
+            self._all_perks = []
+            for ptype in self.perks_data.get('perkTypes', []):
+                self._all_perks.extend(ptype.get('perks', []))
+        else:
+            # V1 format - direct perks array
+            self._all_perks = self.perks_data.get('perks', [])
+        
+        self._perks_by_id = {perk['id']: perk for perk in self._all_perks}
+        
+        weights = self._weights
+        
+        # Rarity selection table
+        prob, alias = _build_alias([weights[r] for r in self._rarities])
+        self._rarity_alias = (prob, alias, self._rarities)
+        
+        # Group perks by rarity
+        perks_by_rarity = defaultdict(list)
+        for perk in self._all_perks:
+            perks_by_rarity[perk.get('rarity', 'common')].append(perk)
+        # Plain dict so lookups of unknown rarities don't insert empty buckets
+        self._perks_by_rarity = dict(perks_by_rarity)
+        
+        # Per-rarity perk selection tables
+        self._perk_alias = {}
+        for rarity, perks in self._perks_by_rarity.items():
+            prob, alias = _build_alias([p.get('weightMultiplier', 1.0) for p in perks])
+            self._perk_alias[rarity] = (prob, alias, perks)
+        
+        # Fast path for unconstrained draws: when every weighted rarity has perks, fold the
+        # rarity and per-rarity tables into one table over all perks (one draw, same odds)
+        self._any_perk_alias = None
+        if self._total_weight > 0 and all(r in self._perks_by_rarity for r in self._rarities):
+            flat_perks = []
+            flat_weights = []
+            for rarity in self._rarities:
+                perks = self._perks_by_rarity[rarity]
+                multipliers = [p.get('weightMultiplier', 1.0) for p in perks]
+                multiplier_total = sum(multipliers)
+                if multiplier_total <= 0:
+                    # Matches _build_alias's uniform fallback for degenerate weights
+                    multipliers = [1.0] * len(perks)
+                    multiplier_total = float(len(perks))
+                flat_perks.extend(perks)
+                flat_weights.extend(self._rarity_prob[rarity] * m / multiplier_total for m in multipliers)
+            prob, alias = _build_alias(flat_weights)
+            self._any_perk_alias = (prob, alias, flat_perks)
+        
+        # Perk types never change after load, so infer them all up front.
+        # Keyed by id() - the catalogue holds every perk alive for our lifetime.
+        self._perk_type_cache = {id(perk): self._infer_perk_type(perk) for perk in self._all_perks}
+        
+        # Per-rarity (perks, types, weights) for drawing around already-used types
+        self._typed_by_rarity = {
+            rarity: (
+                perks,
+                [self._perk_type_cache[id(p)] for p in perks],
+                [p.get('weightMultiplier', 1.0) for p in perks]
+            )
+            for rarity, perks in self._perks_by_rarity.items()
+        }
+        
+        # Rarity value of each perk, used to score rolls without per-perk dict lookups
+        rarity_values = self.rarity_values
+        self._perk_values = {
+            id(perk): rarity_values.get(perk.get('rarity', 'common'), 1.0)
+            for perk in self._all_perks
+        }
         
-        return expected_value
+        # Rarity multisets and luck parameters per perks_count, filled lazily
+        self._composition_cache = {}
+        self._luck_cache = {}
+        
+        # Output-shaped copy of each perk, shared by every roll (treated as read-only)
+        self._output_perks = {id(perk): self._format_perk(perk) for perk in self._all_perks}
+        
+        # Output copies carry their catalogue perk's type, so type lookups on rolled
+        # perks hit the cache too (and see a V1 'type' field the copies don't keep)
+        type_cache = self._perk_type_cache
+        for perk in self._all_perks:
+            type_cache[id(self._output_perks[id(perk)])] = type_cache[id(perk)]
+    
+    def _format_perk(self, perk):
+        """Project a catalogue perk down to the fields sent to clients"""
+        perk_id, name, rarity = _PERK_REQUIRED(perk)
+        return {
+            'id': perk_id,
+            'name': name,
+            'rarity': rarity,
+            'description': perk.get('description', ''),
+            'perkPhase': perk.get('perkPhase', 'drafting'),
+            'effects': perk.get('effects', {})
+        }
+    
+    def _output_perk(self, perk):
+        """Get the prebuilt output dict for a perk (built on the fly for unknown perks)"""
+        output = self._output_perks.get(id(perk))
+        if output is None:
+            output = self._format_perk(perk)
+        return output
+    
+    def _perk_value(self, perk):
+        """Get a perk's rarity value (looked up directly for unknown perks)"""
+        value = self._perk_values.get(id(perk))
+        if value is None:
+            value = self.rarity_values.get(perk.get('rarity', 'common'), 1.0)
+        return value
     
     def _load_perks_data(self):
-        """Load perks data from JSON file"""
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        perks_path = os.path.join(current_dir, '..', 'docs', 'data', 'perks.json')
-        
-        print(f"🎲 Looking for perks.json at: {perks_path}")
-        print(f"🎲 Current dir: {current_dir}")
-        print(f"🎲 File exists: {os.path.exists(perks_path)}")
-        
-        try:
-            with open(perks_path, 'r', encoding='utf-8') as f:
-                perks_data = json.load(f)
-            print(f"🎲 Loaded perks.json successfully, version: {perks_data.get('version', 'unknown')}")
-            return perks_data
-        except FileNotFoundError:
-            print(f"⚠️ perks.json not found at {perks_path}, using fallback")
-            return {
-                'rarityWeights': {'common': 55, 'uncommon': 30, 'rare': 12, 'mythic': 3},
-                'perks': []
-            }
-        except Exception as e:
-            print(f"❌ Error loading perks.json: {str(e)}")
-            raise
-    
-    def get_random_perk(self, preferred_rarity=None, fallback_allowed=True):
+        """Load perks data from JSON file (cached at module level)"""
+        return _get_perks_data()
+    
+    def get_random_perk(self, preferred_rarity=None, fallback_allowed=True, rng=random):
         """
         Select a random perk based on rarity weights.
         
         Args:
             preferred_rarity: If specified, try to get this rarity first
-            fallback_allowed: If True and preferred_rarity not available, use weights
+            fallback_allowed: If True and preferred_rarity has no perks (unknown or
+                              empty rarity), draw by rarity weights instead; if False,
+                              return None so the caller can pick its own fallback
+            rng: Random source (random.Random instance or the random module)
         
         Returns:
-            dict: Random perk
+            dict: Random perk, or None if preferred_rarity has no perks and
+                  fallback_allowed is False
         """
-        # Get all perks (handle both V1 and V2 format)
-        if 'perkTypes' in self.perks_data:
-            # V2 format - flatten perkTypes
-            all_perks = []
-            for ptype in self.perks_data.get('perkTypes', []):
-                all_perks.extend(ptype.get('perks', []))
-        else:
-            # V1 format - direct perks array
-            all_perks = self.perks_data.get('perks', [])
+        # Common case: no preferred rarity and every rarity has perks
+        if preferred_rarity is None and self._any_perk_alias is not None:
+            return _alias_pick(self._any_perk_alias, rng)
         
-        if not all_perks:
+        if not self._all_perks:
             raise ValueError("No perks available in perks data")
         
-        weights = self.perks_data.get('rarityWeights', {
-            'common': 44,
-            'uncommon': 29,
-            'rare': 17,
-            'mythic': 8
-        })
-        
-        # Group perks by rarity
-        perks_by_rarity = {}
-        for perk in all_perks:
-            rarity = perk.get('rarity', 'common')
-            if rarity not in perks_by_rarity:
-                perks_by_rarity[rarity] = []
-            perks_by_rarity[rarity].append(perk)
-        
         # If preferred rarity specified, try that first
-        if preferred_rarity and preferred_rarity in perks_by_rarity:
-            if perks_by_rarity[preferred_rarity]:
-                return random.choice(perks_by_rarity[preferred_rarity])
+        if preferred_rarity:
+            if preferred_rarity in self._perk_alias:
+                return _alias_pick(self._perk_alias[preferred_rarity], rng)
             elif not fallback_allowed:
                 return None
         
         # Otherwise, select rarity based on weights
-        rarities = list(weights.keys())
-        rarity_weights = [weights[r] for r in rarities]
-        selected_rarity = random.choices(rarities, weights=rarity_weights, k=1)[0]
+        selected_rarity = _alias_pick(self._rarity_alias, rng)
         
         # Select random perk from that rarity
-        if selected_rarity in perks_by_rarity and perks_by_rarity[selected_rarity]:
-            return random.choice(perks_by_rarity[selected_rarity])
+        if selected_rarity in self._perk_alias:
+            return _alias_pick(self._perk_alias[selected_rarity], rng)
         else:
             # Fallback to any perk if selected rarity has no perks
-            return random.choice(all_perks)
+            return rng.choice(self._all_perks)
     
 
     
@@ -195,6 +435,14 @@ class PerkRoller:
         For example: all "extra commander" perks are the same type,
         all "color filter" perks are the same type, etc.
         """
+        perk_type = self._perk_type_cache.get(id(perk))
+        if perk_type is None:
+            # Perk dict from outside our catalogue - infer directly
+            perk_type = self._infer_perk_type(perk)
+        return perk_type
+    
+    def _infer_perk_type(self, perk):
+        """Work out a perk's deduplication type from its fields and effects"""
         # If perk has explicit type, use it
         if 'type' in perk:
             return perk['type']
@@ -227,125 +475,255 @@ class PerkRoller:
         # Default: use perk ID as unique type (no deduplication)
         return f'unique_{perk["id"]}'
     
-    def roll_perks_for_player(self, player_name, perks_count, max_attempts_multiplier=10):
+    def _luck_constants(self, perks_count):
+        """
+        Get the luck distribution parameters for a roll of perks_count perks (cached per count).
+        
+        Returns:
+            tuple: (expected_total_value, std_dev, min_target, max_target, tolerance)
+        """
+        constants = self._luck_cache.get(perks_count)
+        if constants is None:
+            expected_total_value = self.expected_value_per_perk * perks_count
+            constants = (
+                expected_total_value,
+                expected_total_value * LUCK_VARIANCE,
+                expected_total_value * LUCK_MIN_MULTIPLIER,
+                expected_total_value * LUCK_MAX_MULTIPLIER,
+                expected_total_value * 0.30  # Tolerance: allow ±30% deviation from the target
+            )
+            self._luck_cache[perks_count] = constants
+        return constants
+    
+    def _rarity_compositions(self, perks_count):
+        """
+        Enumerate every rarity multiset of size perks_count (cached per count).
+        
+        There are only C(perks_count + 3, 3) of these for 4 rarities (35 for 4 perks),
+        so scoring them all up front is cheaper than rolling and rejecting candidates.
+        
+        Multisets whose slots can't all be given distinct perk types are dropped
+        (unless nothing else is possible), since they'd force a duplicate type.
+        
+        Returns:
+            tuple: (compositions, values)
+                - compositions: (counts, value, probability) tuples sorted by value, where
+                  counts lines up with self._rarities and probability is the multinomial
+                  probability of rolling exactly that multiset with the rarity weights
+                - values: the value of each composition, for bisecting a target window
+        """
+        if perks_count in self._composition_cache:
+            return self._composition_cache[perks_count]
+        
+        rarity_probs = [self._rarity_prob[r] for r in self._rarities]
+        rarity_vals = [self.rarity_values[r] for r in self._rarities]
+        
+        compositions = []
+        
+        def build(index, remaining, counts):
+            if index == len(self._rarities) - 1:
+                counts = counts + [remaining]
+                probability = math.factorial(perks_count)
+                for count, rarity_prob in zip(counts, rarity_probs):
+                    probability *= rarity_prob ** count / math.factorial(count)
+                value = sum(c * v for c, v in zip(counts, rarity_vals))
+                compositions.append((tuple(counts), value, probability))
+                return
+            for count in range(remaining + 1):
+                build(index + 1, remaining - count, counts + [count])
+        
+        if self._rarities:
+            build(0, perks_count, [])
+        
+        feasible = [c for c in compositions if self._has_distinct_types(c[0])]
+        if feasible:
+            compositions = feasible
+        
+        compositions.sort(key=lambda c: c[1])
+        result = (compositions, [c[1] for c in compositions])
+        self._composition_cache[perks_count] = result
+        return result
+    
+    def _has_distinct_types(self, counts):
+        """
+        Check whether a rarity multiset can be filled without repeating a perk type.
+        
+        Types are shared across rarities, so this is a small bipartite matching
+        of rarity slots to perk types (augmenting paths, at most a few dozen nodes).
+        
+        Args:
+            counts: Perk count per rarity, lined up with self._rarities
+        
+        Returns:
+            bool: True if every slot can get its own type
+        """
+        # Rarities without perks fall back to any perk, so they don't constrain anything
+        slot_types = []
+        for rarity, count in zip(self._rarities, counts):
+            if rarity in self._perks_by_rarity:
+                types = {self.get_perk_type(p) for p in self._perks_by_rarity[rarity]}
+                slot_types.extend([types] * count)
+        
+        matched_slot = {}  # perk type -> slot index
+        
+        def assign(slot, seen):
+            for perk_type in slot_types[slot]:
+                if perk_type in seen:
+                    continue
+                seen.add(perk_type)
+                if perk_type not in matched_slot or assign(matched_slot[perk_type], seen):
+                    matched_slot[perk_type] = slot
+                    return True
+            return False
+        
+        return all(assign(slot, set()) for slot in range(len(slot_types)))
+    
+    def _pick_perk_of_rarity(self, rarity, used_types, candidate=None, rng=random):
+        """
+        Pick a perk of the given rarity whose type hasn't been used yet.
+        
+        A single weighted draw is tried first; on a type collision the pick is made
+        directly from the perks of this rarity whose type is still free, which gives
+        the same odds as redrawing until a free type comes up.
+        
+        Args:
+            rarity: Rarity to pick from
+            used_types: Set of perk types already held (updated in place)
+            candidate: Optional pre-drawn first candidate
+            rng: Random source (random.Random instance or the random module)
+        
+        Returns:
+            dict: Selected perk
+        """
+        if candidate is None:
+            candidate = self.get_random_perk(preferred_rarity=rarity, fallback_allowed=False, rng=rng)
+        
+        if candidate is not None:
+            # Candidates are almost always catalogue perks, so hit the cache directly
+            perk_type = self._perk_type_cache.get(id(candidate))
+            if perk_type is None:
+                perk_type = self.get_perk_type(candidate)
+            
+            if perk_type not in used_types:
+                used_types.add(perk_type)
+                return candidate
+        
+        # Type collision - draw from the perks of this rarity with an unused type
+        typed = self._typed_by_rarity.get(rarity)
+        if typed is not None:
+            allowed = [i for i, perk_type in enumerate(typed[1]) if perk_type not in used_types]
+            if allowed:
+                weights = typed[2]
+                if sum(weights[i] for i in allowed) > 0:
+                    i = rng.choices(allowed, weights=[weights[i] for i in allowed])[0]
+                else:
+                    i = rng.choice(allowed)
+                used_types.add(typed[1][i])
+                return typed[0][i]
+        
+        # Fallback: if can't find unique type, just take any perk of this rarity
+        return self.get_random_perk(preferred_rarity=rarity, fallback_allowed=True, rng=rng)
+    
+    def roll_perks_for_player(self, player_name, perks_count, max_attempts_multiplier=10, rng=random):
         """
         Roll perks for a single player using constrained multinomial sampling.
         
         Algorithm:
         1. Roll a "luck target" from normal distribution (mean = expected value * count)
-        2. Repeatedly roll perks using standard 44/29/17/8 weights
-        3. Accept the roll if total value is close to the luck target
-        4. Apply type-based deduplication
+        2. Score every rarity multiset of size perks_count by total value
+        3. Sample one multiset within tolerance of the luck target, weighted by its
+           probability under the standard 44/29/17/8 weights (nearest one if none fit)
+        4. Fill each rarity slot with a perk, applying type-based deduplication
+        
+        The rarity multiset follows the same distribution as rolling rarities with
+        44/29/17/8 weights and rejecting rolls outside tolerance, but in a single pass.
         
-        This maintains the 44/29/17/8 rarity distribution across all players
-        while constraining individual player variance using rejection sampling.
+        This is deliberately not the old per-perk rejection roller's distribution: that
+        redrew the whole perk (rarity included) on a type collision, which skewed
+        multisets away from rarities with few perk types. Here type deduplication only
+        picks among perks of the already-chosen rarity, so the 44/29/17/8 weights hold.
         
         Args:
             player_name: Name of the player (for logging)
             perks_count: Number of perks to roll
-            max_attempts_multiplier: Max attempts for rejection sampling
+            max_attempts_multiplier: Unused, kept for backwards compatibility
+            rng: Random source (random.Random instance or the random module)
         
         Returns:
             tuple: (perks_list, luck_score)
                 - perks_list: List of perk dicts
                 - luck_score: Player's rolled luck value (for optional display)
         """
-        print(f"🎲 Rolling perks for player {player_name}")
+        logger.debug("🎲 Rolling perks for player %s", player_name)
+        
+        if not self._all_perks:
+            raise ValueError("No perks available in perks data")
         
         # Step 1: Calculate player's luck target using normal distribution
-        expected_total_value = self.expected_value_per_perk * perks_count
-        std_dev = expected_total_value * LUCK_VARIANCE
+        expected_total_value, std_dev, min_target, max_target, tolerance = self._luck_constants(perks_count)
+        
+        # Roll luck target from normal distribution, clamped to prevent absurd extremes
+        luck_target = max(min_target, min(rng.gauss(expected_total_value, std_dev), max_target))
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            luck_percentile = (luck_target / expected_total_value) * 100 if expected_total_value else 0
+            logger.debug("🎲   Luck target: %.2f (expected: %.2f, %.0f%%)", luck_target, expected_total_value, luck_percentile)
         
-        # Roll luck target from normal distribution
-        luck_target = random.gauss(expected_total_value, std_dev)
+        # Step 2: Pick a rarity multiset close to the luck target
+        compositions, values = self._rarity_compositions(perks_count)
         
-        # Clamp to prevent absurd extremes
-        min_target = expected_total_value * LUCK_MIN_MULTIPLIER
-        max_target = expected_total_value * LUCK_MAX_MULTIPLIER
-        luck_target = max(min_target, min(luck_target, max_target))
+        # Compositions are sorted by value, so the tolerance window is a contiguous slice
+        lo = bisect_left(values, luck_target - tolerance)
+        hi = bisect_right(values, luck_target + tolerance)
+        in_tolerance = compositions[lo:hi]
         
-        luck_percentile = (luck_target / expected_total_value) * 100
-        print(f"🎲   Luck target: {luck_target:.2f} (expected: {expected_total_value:.2f}, {luck_percentile:.0f}%)")
+        if in_tolerance:
+            counts, target_value, _ = rng.choices(
+                in_tolerance,
+                weights=[c[2] for c in in_tolerance],
+                k=1
+            )[0]
+        else:
+            # Nothing fits the tolerance window - take the closest multiset either side of it
+            neighbours = compositions[max(lo - 1, 0):lo + 1]
+            counts, target_value, _ = min(neighbours, key=lambda c: abs(c[1] - luck_target))
         
-        # Step 2: Acceptance-rejection sampling with type deduplication
-        # Tolerance: how close to target we need to be
-        # Lower tolerance = stricter matching = more attempts needed but better accuracy
-        tolerance = expected_total_value * 0.30  # Allow ±30% deviation
+        logger.debug("🎲   Selected rarity multiset: value=%.2f, target=%.2f, distance=%.2f",
+                     target_value, luck_target, abs(target_value - luck_target))
         
-        best_perks = None
-        best_distance = float('inf')
+        # Step 3: Fill rarity slots with perks (with type deduplication)
+        # Rarest slots go first since they have the fewest perk types to choose from
+        rarity_slots = []
+        for i in self._rarest_first:
+            rarity_slots.extend([self._rarities[i]] * counts[i])
         
-        max_attempts = perks_count * max_attempts_multiplier * 10  # More attempts for rejection sampling
+        pick_perk = self._pick_perk_of_rarity
+        perk_value = self._perk_value
         
-        for attempt in range(max_attempts):
-            # Roll perks using standard weights (44/29/17/8)
-            candidate_perks = []
+        # A greedy fill can still paint itself into a corner, so retry a few times
+        for fill_attempt in range(10):
+            best_perks = [None] * perks_count
             used_types = set()
+            actual_value = 0.0
+            for slot, rarity in enumerate(rarity_slots):
+                perk = pick_perk(rarity, used_types, rng=rng)
+                best_perks[slot] = perk
+                actual_value += perk_value(perk)
             
-            # Roll each perk slot
-            for slot in range(perks_count):
-                sub_attempts = 0
-                while sub_attempts < 50:  # Try to avoid duplicate types
-                    perk = self.get_random_perk()  # Uses 44/29/17/8 weights
-                    perk_type = self.get_perk_type(perk)
-                    
-                    if perk_type not in used_types:
-                        candidate_perks.append(perk)
-                        used_types.add(perk_type)
-                        break
-                    
-                    sub_attempts += 1
-                
-                # Fallback: if we can't find unique type, just add it anyway
-                if len(candidate_perks) < slot + 1:
-                    candidate_perks.append(perk)
-                    used_types.add(self.get_perk_type(perk))
-            
-            # Calculate total value of this roll
-            total_value = sum(self.rarity_values.get(p.get('rarity', 'common'), 1.0) for p in candidate_perks)
-            distance = abs(total_value - luck_target)
-            
-            # Check if this is acceptable (within tolerance)
-            if distance <= tolerance:
-                print(f"🎲   ✅ Accepted on attempt {attempt + 1}: value={total_value:.2f}, target={luck_target:.2f}, distance={distance:.2f}")
-                best_perks = candidate_perks
+            # Duplicates aren't added to used_types
+            if len(used_types) == len(best_perks):
                 break
-            
-            # Track best so far in case we don't find perfect match
-            if distance < best_distance:
-                best_distance = distance
-                best_perks = candidate_perks
-            
-            # Every 100 attempts, log progress
-            if (attempt + 1) % 100 == 0:
-                print(f"🎲   Attempt {attempt + 1}: best distance so far = {best_distance:.2f}")
-        
-        if best_perks is None:
-            print(f"⚠️ Warning: No perks found after {max_attempts} attempts!")
-            # Emergency fallback: just roll normally without constraints
-            best_perks = []
-            for _ in range(perks_count):
-                best_perks.append(self.get_random_perk())
+        rng.shuffle(best_perks)
         
         # Convert to output format
-        player_perks = []
-        for perk in best_perks:
-            player_perks.append({
-                'id': perk['id'],
-                'name': perk['name'],
-                'rarity': perk['rarity'],
-                'description': perk.get('description', ''),
-                'perkPhase': perk.get('perkPhase', 'drafting'),
-                'effects': perk.get('effects', {})
-            })
-        
-        # Calculate actual value received
-        actual_value = sum(self.rarity_values.get(p['rarity'], 1.0) for p in player_perks)
-        print(f"🎲 Final perks for {player_name}: {len(player_perks)} (value: {actual_value:.2f} vs target: {luck_target:.2f})")
+        player_perks = [self._output_perk(perk) for perk in best_perks]
+        
+        logger.debug("🎲 Final perks for %s: %d (value: %.2f vs target: %.2f)",
+                     player_name, len(player_perks), actual_value, luck_target)
         
         return player_perks, luck_target
     
-    def roll_perks_for_session(self, session, perks_count):
+    def roll_perks_for_session(self, session, perks_count, rng=None):
         """
         Roll perks for all players in a session using combination matching.
         
@@ -362,99 +740,96 @@ class PerkRoller:
         Args:
             session: Session dict with 'players' list
             perks_count: Number of perks to roll per player
+            rng: Optional random.Random to draw from. A fresh OS-seeded instance is
+                 used per session by default so concurrent sessions don't share state.
         
         Returns:
             Updated session dict with perks assigned to each player
         """
-        print(f"🎲 Rolling {perks_count} perks per player for session")
-        print(f"🎲 Luck system: variance={LUCK_VARIANCE}, min={LUCK_MIN_MULTIPLIER}x, max={LUCK_MAX_MULTIPLIER}x")
+        logger.info("🎲 Rolling %d perks per player for session", perks_count)
+        logger.debug("🎲 Luck system: variance=%s, min=%sx, max=%sx", LUCK_VARIANCE, LUCK_MIN_MULTIPLIER, LUCK_MAX_MULTIPLIER)
+        
+        if rng is None:
+            rng = random.Random()
         
         num_players = len(session['players'])
         total_perks = num_players * perks_count
         
         # Step 1: Calculate exact global rarity distribution (preserves 44/29/17/8)
-        weights = self.perks_data.get('rarityWeights', {
-            'common': 44,
-            'uncommon': 29,
-            'rare': 17,
-            'mythic': 8
-        })
-        
-        total_weight = sum(weights.values())
-        
         # Allocate perks to each rarity (rounded to ensure we have exactly total_perks)
         global_rarity_counts = {}
         allocated = 0
-        rarities_sorted = sorted(weights.keys(), key=lambda r: weights[r], reverse=True)
+        rarities_sorted = self._rarities_sorted
         
         for i, rarity in enumerate(rarities_sorted):
             if i == len(rarities_sorted) - 1:
                 # Last rarity gets remainder to ensure exact count
                 global_rarity_counts[rarity] = total_perks - allocated
             else:
-                count = round(total_perks * weights[rarity] / total_weight)
+                count = round(total_perks * self._rarity_prob[rarity])
                 global_rarity_counts[rarity] = count
                 allocated += count
         
-        print(f"🎲 Global rarity allocation for {total_perks} perks:")
-        for rarity in ['common', 'uncommon', 'rare', 'mythic']:
-            count = global_rarity_counts.get(rarity, 0)
-            pct = (count / total_perks * 100) if total_perks > 0 else 0
-            print(f"   {rarity}: {count} ({pct:.1f}%)")
-        
-        # Step 2: Generate luck targets from normal distribution
-        expected_total_value = self.expected_value_per_perk * perks_count
-        std_dev = expected_total_value * LUCK_VARIANCE
-        
-        luck_targets = []
-        for _ in range(num_players):
-            luck_target = random.gauss(expected_total_value, std_dev)
-            
-            # Clamp to prevent extremes
-            min_target = expected_total_value * LUCK_MIN_MULTIPLIER
-            max_target = expected_total_value * LUCK_MAX_MULTIPLIER
-            luck_target = max(min_target, min(luck_target, max_target))
-            
-            luck_targets.append(luck_target)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🎲 Expected rarity probabilities:\n%s", self._pct_banner)
+            logger.debug("🎲 Global rarity allocation for %d perks:", total_perks)
+            for rarity in ['common', 'uncommon', 'rare', 'mythic']:
+                count = global_rarity_counts.get(rarity, 0)
+                pct = (count / total_perks * 100) if total_perks > 0 else 0
+                logger.debug("   %s: %d (%.1f%%)", rarity, count, pct)
+        
+        # Step 2: Generate luck targets from normal distribution (clamped to prevent extremes)
+        expected_total_value, std_dev, min_target, max_target, _ = self._luck_constants(perks_count)
+        gauss = rng.gauss
+        luck_targets = [
+            max(min_target, min(gauss(expected_total_value, std_dev), max_target))
+            for _ in range(num_players)
+        ]
         
         # Step 3: Generate perk combinations with correct rarities
-        print(f"\n🎲 Generating {num_players} perk combinations...")
-        perk_combinations = self._generate_perk_combinations(
+        logger.debug("🎲 Generating %d perk combinations...", num_players)
+        combinations_with_value = self._generate_perk_combinations(
             global_rarity_counts,
             num_players,
-            perks_count
+            perks_count,
+            rng
         )
         
         # Step 4: Sort combinations by value and match to sorted luck targets
-        combinations_with_value = [
-            (combo, sum(self.rarity_values.get(perk['rarity'], 1.0) for perk in combo))
-            for combo in perk_combinations
-        ]
         combinations_with_value.sort(key=lambda x: x[1])
         luck_targets.sort()
         
+        # Luck targets are i.i.d., so which player holds the i-th lowest one is a
+        # uniformly random ranking - without this, seat order would decide luck
+        players_by_luck = list(session['players'])
+        rng.shuffle(players_by_luck)
+        
         # Step 5: Assign combinations to players
-        print(f"\n🎲 Assigning perk combinations to players...")
+        log_players = logger.isEnabledFor(logging.DEBUG)
         
-        for i, player in enumerate(session['players']):
+        for i, player in enumerate(players_by_luck):
             combo, actual_value = combinations_with_value[i]
-            target_value = luck_targets[i]
             
-            player_name = player.get('name', 'unknown')
-            luck_percentile = (actual_value / expected_total_value) * 100
-            target_percentile = (target_value / expected_total_value) * 100
-            
-            print(f"\n🎲 Player: {player_name}")
-            print(f"   Target: {target_value:.2f} ({target_percentile:.0f}%), Actual: {actual_value:.2f} ({luck_percentile:.0f}%)")
-            print(f"   Rarities: {', '.join(perk['rarity'] for perk in combo)}")
+            if log_players:
+                target_value = luck_targets[i]
+                luck_percentile = (actual_value / expected_total_value) * 100
+                target_percentile = (target_value / expected_total_value) * 100
+                logger.debug("🎲 Player: %s - Target: %.2f (%.0f%%), Actual: %.2f (%.0f%%), Rarities: %s",
+                             player.get('name', 'unknown'), target_value, target_percentile,
+                             actual_value, luck_percentile, ', '.join(perk['rarity'] for perk in combo))
             
             player['perks'] = combo
         
-        print(f"\n🎲 Session complete!")
+        if log_players:
+            # Single pass over the assigned perks to confirm the rarity split held
+            rarity_counts = Counter(perk['rarity'] for player in session['players'] for perk in player['perks'])
+            logger.debug("🎲 Assigned rarity distribution: %s", dict(rarity_counts))
+        
+        logger.info("🎲 Session complete!")
         
         return session
     
-    def _generate_perk_combinations(self, global_rarity_counts, num_players, perks_count):
+    def _generate_perk_combinations(self, global_rarity_counts, num_players, perks_count, rng=random):
         """
         Generate perk combinations that exactly use up the global rarity counts.
         
@@ -464,212 +839,58 @@ class PerkRoller:
             global_rarity_counts: dict of {rarity: total_count}
             num_players: Number of players
             perks_count: Perks per player
+            rng: Random source (random.Random instance or the random module)
         
         Returns:
-            List of perk combinations (each is a list of perk dicts)
+            List of (perk combination, total value) tuples
         """
-        # Create pool of rarity slots
-        rarity_slots = []
-        for rarity, count in global_rarity_counts.items():
-            rarity_slots.extend([rarity] * count)
+        # Create pool of rarity slots (one allocation, no per-rarity temporary lists)
+        rarity_slots = list(chain.from_iterable(
+            repeat(rarity, count) for rarity, count in global_rarity_counts.items()
+        ))
         
         # Shuffle to randomize distribution
-        random.shuffle(rarity_slots)
+        rng.shuffle(rarity_slots)
+        
+        # Draw every perk the session needs up front, one batch per rarity
+        rarity_pools = {}
+        for rarity, count in global_rarity_counts.items():
+            if rarity in self._perk_alias:
+                rarity_pools[rarity] = _alias_sample(self._perk_alias[rarity], count, rng)
+            else:
+                # No perks of this rarity - fall back to weighted selection
+                rarity_pools[rarity] = [self.get_random_perk(rng=rng) for _ in range(count)]
+        
+        pick_perk = self._pick_perk_of_rarity
+        perk_value = self._perk_value
+        output_perk = self._output_perk
         
         # Split into chunks for each player
-        combinations = []
+        combinations = [None] * num_players
         for i in range(num_players):
             start_idx = i * perks_count
             end_idx = start_idx + perks_count
             player_rarities = rarity_slots[start_idx:end_idx]
             
             # Roll actual perks for these rarities (with type deduplication)
-            player_perks = []
+            player_perks = [None] * perks_count
             used_types = set()
+            combo_value = 0.0
             
-            for rarity in player_rarities:
-                max_attempts = 50
-                perk = None
-                
-                for attempt in range(max_attempts):
-                    candidate = self.get_random_perk(preferred_rarity=rarity, fallback_allowed=False)
-                    
-                    if candidate is None:
-                        break
-                    
-                    perk_type = self.get_perk_type(candidate)
-                    
-                    if perk_type not in used_types:
-                        perk = candidate
-                        used_types.add(perk_type)
-                        break
-                
-                # Fallback: if can't find unique type, just take any perk of this rarity
-                if perk is None:
-                    perk = self.get_random_perk(preferred_rarity=rarity, fallback_allowed=True)
-                
-                player_perks.append({
-                    'id': perk['id'],
-                    'name': perk['name'],
-                    'rarity': perk['rarity'],
-                    'description': perk.get('description', ''),
-                    'perkPhase': perk.get('perkPhase', 'drafting'),
-                    'effects': perk.get('effects', {})
-                })
+            for slot, rarity in enumerate(player_rarities):
+                # First candidate comes from the pre-drawn batch
+                perk = pick_perk(rarity, used_types, candidate=rarity_pools[rarity].pop(), rng=rng)
+                player_perks[slot] = output_perk(perk)
+                combo_value += perk_value(perk)
             
-            combinations.append(player_perks)
+            combinations[i] = (player_perks, combo_value)
         
         return combinations
-    
-    def _select_perks_from_pool_DEPRECATED(self, rarity_pool, perks_count, luck_target, player_name):
-        """
-        DEPRECATED: This greedy knapsack approach doesn't produce normal distribution.
-        Kept for reference only.
-        
-        Select perks from the global rarity pool that sum close to luck target.
-        Uses a greedy knapsack approach with type deduplication.
-        
-        Args:
-            rarity_pool: dict of {rarity: remaining_count}
-            perks_count: Number of perks to select
-            luck_target: Target total value
-            player_name: Player name for logging
-        
-        Returns:
-            List of perk dicts
-        """
-        selected_perks = []
-        used_types = set()
-        
-        # Calculate target value per slot
-        remaining_value = luck_target
-        remaining_slots = perks_count
-        
-        for slot in range(perks_count):
-            # Calculate ideal value for this slot
-            if remaining_slots > 0:
-                target_value = remaining_value / remaining_slots
-            else:
-                target_value = self.expected_value_per_perk
-            
-            # Find best available rarity (closest to target, available in pool)
-            best_rarity = None
-            best_distance = float('inf')
-            
-            for rarity, count in rarity_pool.items():
-                if count > 0:  # Only consider rarities with remaining perks
-                    rarity_value = self.rarity_values.get(rarity, 1.0)
-                    distance = abs(rarity_value - target_value)
-                    
-                    if distance < best_distance:
-                        best_distance = distance
-                        best_rarity = rarity
-            
-            if best_rarity is None:
-                print(f"   ⚠️ No rarities available in pool!")
-                break
-            
-            # Try to get a perk of that rarity (with type deduplication)
-            max_attempts = 50
-            perk = None
-            
-            for attempt in range(max_attempts):
-                candidate = self.get_random_perk(preferred_rarity=best_rarity, fallback_allowed=False)
-                
-                if candidate is None:
-                    # No perks of this rarity, try next best
-                    break
-                
-                perk_type = self.get_perk_type(candidate)
-                
-                if perk_type not in used_types:
-                    perk = candidate
-                    used_types.add(perk_type)
-                    break
-            
-            # Fallback: if can't find unique type, just take any perk of this rarity
-            if perk is None:
-                perk = self.get_random_perk(preferred_rarity=best_rarity, fallback_allowed=True)
-            
-            # Add perk and update pool
-            selected_perks.append({
-                'id': perk['id'],
-                'name': perk['name'],
-                'rarity': perk['rarity'],
-                'description': perk.get('description', ''),
-                'perkPhase': perk.get('perkPhase', 'drafting'),
-                'effects': perk.get('effects', {})
-            })
-            
-            # Deduct from pool
-            perk_rarity = perk['rarity']
-            rarity_pool[perk_rarity] -= 1
-            
-            # Update remaining values
-            actual_value = self.rarity_values.get(perk_rarity, 1.0)
-            remaining_value -= actual_value
-            remaining_slots -= 1
-            
-            print(f"   Slot {slot+1}: {best_rarity} (value {actual_value:.2f}, remaining: {remaining_value:.2f})")
-        
-        return selected_perks
-    
-    def _old_knapsack_implementation(self, rarity_pool, perks_count, luck_target, player_name):
-        """
-        DEPRECATED: Old implementation kept for reference.
-        """
-        selected_perks = []
-        used_types = set()
-        
-        # Calculate target value per slot
-        remaining_value = luck_target
-        remaining_slots = perks_count
-        
-        for slot in range(perks_count):
-            # Calculate ideal value for this slot
-            if remaining_slots > 0:
-                target_value = remaining_value / remaining_slots
-            else:
-                target_value = self.expected_value_per_perk
-            
-            # Find best available rarity (closest to target, available in pool)
-            best_rarity = None
-            best_distance = float('inf')
-            
-            for rarity, count in rarity_pool.items():
-                if count > 0:  # Only consider rarities with remaining perks
-                    rarity_value = self.rarity_values.get(rarity, 1.0)
-                    distance = abs(rarity_value - target_value)
-                    
-                    if distance < best_distance:
-                        best_distance = distance
-                        best_rarity = rarity
-            
-            if best_rarity is None:
-                print(f"   ⚠️ No rarities available in pool!")
-                break
-            
-            # Try to get a perk of that rarity (with type deduplication)
-            max_attempts = 50
-            perk = None
-            
-            for attempt in range(max_attempts):
-                candidate = self.get_random_perk(preferred_rarity=best_rarity, fallback_allowed=False)
-                
-                if candidate is None:
-                    # No perks of this rarity, try next best
-                    break
-                
-                perk_type = self.get_perk_type(candidate)
-                
-                if perk_type not in used_types:
-                    perk = candidate
-                    used_types.add(perk_type)
-                    break
-            
-            # Fallback: if can't find unique type, just take any perk of this rarity
-            if perk is None:
-                perk = self.get_random_perk(preferred_rarity=best_rarity, fallback_allowed=True)
+
+
+def get_perks_by_id():
+    """Get the perk catalogue keyed by perk id (shared, treat as read-only)"""
+    return _get_roller()._perks_by_id
 
 
 def handle_roll_perks_request(session, player_id):
@@ -689,15 +910,13 @@ def handle_roll_perks_request(session, player_id):
     
     # Get perks count from session settings
     perks_count = session.get('settings', {}).get('perksCount', 3)
-    print(f"🎲 Rolling {perks_count} perks per player")
     
-    # Initialize perk roller and roll perks
-    roller = PerkRoller()
+    # Roll perks with the shared roller
+    roller = _get_roller()
     session = roller.roll_perks_for_session(session, perks_count)
     
     # Update session state
     session['state'] = 'selecting'
     session['updated_at'] = time.time()
-    print(f"🎲 Updating session with new state: selecting")
     
     return (True, None, None, session)
@@ -8,10 +8,13 @@ import time
 import random
 import string
 import os
-from typing import Dict, List, Optional
+import heapq
+import hashlib
+import traceback
+from typing import Dict, List, Optional, Tuple
 
 # Import perk rolling logic
-from api.perk_roller import handle_roll_perks_request
+from api.perk_roller import handle_roll_perks_request, get_perks_by_id, PERKS_PATH
 
 # Vercel KV (Redis) for pack code persistence
 try:
@@ -27,11 +30,15 @@ try:
     REDIS_TOKEN = os.environ.get('KV_REST_API_TOKEN', '')
     
     if REDIS_URL:
-        # Vercel KV provides a complete URL, try to use it directly
+        # Vercel KV provides a complete URL, try to use it directly.
+        # One pooled client per container: warm invocations reuse its connections,
+        # so handlers must never create or close their own.
         try:
             kv_client = redis.from_url(
                 REDIS_URL,
-                decode_responses=True
+                decode_responses=True,
+                socket_keepalive=True,  # Keep idle pooled connections open between invocations
+                health_check_interval=30  # Re-ping connections idle this long before reuse
             )
             # Test connection
             kv_client.ping()
@@ -58,6 +65,16 @@ SESSIONS: Dict[str, dict] = {}
 # In-memory pack code fallback (only used if KV is not available)
 PACK_CODES: Dict[str, dict] = {}
 
+# Pack codes held by players of in-memory sessions -> owning session code.
+# Lets pack code generation check uniqueness without scanning every session.
+PACK_CODE_SESSIONS: Dict[str, str] = {}
+
+# Min-heaps of (expires_at, code) so cleanup only touches entries that are due.
+# Session activity can push expiry back, so popped entries are re-checked and
+# rescheduled rather than trusted.
+SESSION_EXPIRY: List[Tuple[float, str]] = []
+PACK_CODE_EXPIRY: List[Tuple[float, str]] = []
+
 # Session expiration time (12 hours - increased to prevent premature expiration during long game sessions)
 # TTL is refreshed on every update, so active sessions stay alive indefinitely
 SESSION_TTL = 12 * 60 * 60
@@ -66,17 +83,79 @@ SESSION_TTL = 12 * 60 * 60
 # Redis will automatically remove oldest pack codes if memory limit reached
 PACK_CODE_TTL = 24 * 60 * 60  # 24 hours
 
+# Minimum seconds between expiry sweeps triggered by incoming requests.
+# TTLs are measured in hours, so sweeping once a minute bounds staleness without
+# paying for cleanup on every poll.
+CLEANUP_INTERVAL = 60
+last_cleanup_at = 0.0
+
+# Largest POST body accepted (session payloads are a few KB at most)
+MAX_BODY_SIZE = 64 * 1024
+
+def session_expires_at(session_data: dict) -> float:
+    """Get the time an in-memory session expires (TTL slides with activity)"""
+    return session_data.get('lastActivity', session_data.get('created_at', time.time())) + SESSION_TTL
+
+def cache_session(session_code: str, session_data: dict):
+    """Keep a session in memory, scheduling its expiry check the first time it's seen"""
+    previous = SESSIONS.get(session_code)
+    if previous is None:
+        heapq.heappush(SESSION_EXPIRY, (session_expires_at(session_data), session_code))
+    elif previous is not session_data:
+        # Replaced by a copy (e.g. reloaded from KV) - its players may have changed
+        forget_session_pack_codes(session_code, previous)
+    SESSIONS[session_code] = session_data
+    # Sessions loaded from KV may carry pack codes generated elsewhere (an existing
+    # owner keeps its entry - rewriting it would let one session evict another)
+    for player in session_data.get('players', []):
+        if player.get('packCode') and not player.get('isKicked'):
+            PACK_CODE_SESSIONS.setdefault(player['packCode'], session_code)
+
+def forget_player_pack_code(session_code: str, player: dict):
+    """Drop a player's pack code from the uniqueness index if this session still owns it"""
+    pack_code = player.get('packCode')
+    if pack_code and PACK_CODE_SESSIONS.get(pack_code) == session_code:
+        del PACK_CODE_SESSIONS[pack_code]
+
+def forget_session_pack_codes(session_code: str, session_data: dict):
+    """Drop a session's player pack codes from the uniqueness index"""
+    for player in session_data.get('players', []):
+        forget_player_pack_code(session_code, player)
+
+def cache_pack_code(pack_code: str, data: dict):
+    """Keep a pack code in memory with its expiry"""
+    expires_at = time.time() + PACK_CODE_TTL
+    PACK_CODES[pack_code] = {
+        'data': data,
+        'expires_at': expires_at
+    }
+    heapq.heappush(PACK_CODE_EXPIRY, (expires_at, pack_code))
+
+# Codes and IDs map os.urandom bytes onto a 36-character alphabet with
+# bytes.translate. Bytes 252-255 are dropped so every character is equally likely.
+CODE_BYTE_LIMIT = 252  # 7 * 36
+UPPER_CODE_TABLE = bytes(ord((string.ascii_uppercase + string.digits)[b % 36]) for b in range(256))
+LOWER_CODE_TABLE = bytes(ord((string.ascii_lowercase + string.digits)[b % 36]) for b in range(256))
+REJECTED_CODE_BYTES = bytes(range(CODE_BYTE_LIMIT, 256))
+
+def random_code(table: bytes, length: int) -> str:
+    """Generate a random code of the given length from an alphabet translation table"""
+    code = b''
+    while len(code) < length:
+        code += os.urandom(length).translate(table, REJECTED_CODE_BYTES)
+    return code[:length].decode('ascii')
+
 def generate_session_code() -> str:
     """Generate a random 5-character session code"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+    return random_code(UPPER_CODE_TABLE, 5)
 
 def generate_player_id() -> str:
     """Generate a unique player ID"""
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=16))
+    return random_code(LOWER_CODE_TABLE, 16)
 
 def generate_pack_code() -> str:
     """Generate a unique pack code"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    return random_code(UPPER_CODE_TABLE, 8)
 
 def store_pack_code(pack_code: str, data: dict) -> bool:
     """
@@ -92,19 +171,13 @@ def store_pack_code(pack_code: str, data: dict) -> bool:
             return True
         else:
             # Fallback to in-memory storage
-            PACK_CODES[pack_code] = {
-                'data': data,
-                'expires_at': time.time() + PACK_CODE_TTL
-            }
+            cache_pack_code(pack_code, data)
             print(f"ΓÜá∩╕Å Stored pack code {pack_code} in memory (will be lost on function restart)")
             return True
     except Exception as e:
         print(f"Γ¥î Error storing pack code {pack_code}: {e}")
         # Fallback to in-memory
-        PACK_CODES[pack_code] = {
-            'data': data,
-            'expires_at': time.time() + PACK_CODE_TTL
-        }
+        cache_pack_code(pack_code, data)
         return False
 
 def get_pack_code(pack_code: str) -> Optional[dict]:
@@ -148,11 +221,17 @@ def get_pack_code(pack_code: str) -> Optional[dict]:
                 return entry['data']
         return None
 
-def store_session(session_code: str, session_data: dict) -> bool:
+def store_session(session_code: str, session_data: dict, content_changed: bool = True) -> bool:
     """
     Store session data with TTL
     Uses Vercel KV if available, falls back to in-memory
+    
+    The session's ETag is computed here and saved with it, so GETs just read it.
+    content_changed=False (activity timestamps only) keeps the stored tag, which
+    still describes the content since timestamps aren't part of it.
     """
+    if content_changed or 'etag' not in session_data:
+        session_data['etag'] = session_etag(session_data)
     print(f"≡ƒÆ╛ [STORE_SESSION] Storing session {session_code}, state: {session_data.get('state')}, players: {len(session_data.get('players', []))}")
     start_time = time.time()
     
@@ -166,16 +245,15 @@ def store_session(session_code: str, session_data: dict) -> bool:
             return True
         else:
             # Fallback to in-memory storage
-            SESSIONS[session_code] = session_data
+            cache_session(session_code, session_data)
             print(f"ΓÜá∩╕Å [STORE_SESSION] Stored session {session_code} in memory (will be lost on function restart)")
             return True
     except Exception as e:
         elapsed = (time.time() - start_time) * 1000
         print(f"Γ¥î [STORE_SESSION] Error storing session {session_code} ({elapsed:.1f}ms): {e}")
-        import traceback
         traceback.print_exc()
         # Fallback to in-memory
-        SESSIONS[session_code] = session_data
+        cache_session(session_code, session_data)
         print(f"ΓÜá∩╕Å [STORE_SESSION] Fell back to in-memory storage")
         return False
 
@@ -201,7 +279,7 @@ def get_session(session_code: str) -> Optional[dict]:
                 print(f"Γ£à [GET_SESSION] Retrieved session {session_code} from Vercel KV ({elapsed:.1f}ms)")
                 print(f"≡ƒôè [GET_SESSION] Session state: {session_data.get('state')}, players: {len(session_data.get('players', []))}")
                 # Also cache in memory for this function instance
-                SESSIONS[session_code] = session_data
+                cache_session(session_code, session_data)
                 return session_data
             else:
                 print(f"ΓÜá∩╕Å [GET_SESSION] Session {session_code} not found in Vercel KV ({elapsed:.1f}ms)")
@@ -225,7 +303,6 @@ def get_session(session_code: str) -> Optional[dict]:
     except Exception as e:
         elapsed = (time.time() - start_time) * 1000
         print(f"Γ¥î [GET_SESSION] Error retrieving session {session_code} ({elapsed:.1f}ms): {e}")
-        import traceback
         traceback.print_exc()
         # Try in-memory fallback
         if session_code in SESSIONS:
@@ -233,14 +310,14 @@ def get_session(session_code: str) -> Optional[dict]:
             return SESSIONS[session_code]
         return None
 
-def update_session(session_code: str, session_data: dict) -> bool:
+def update_session(session_code: str, session_data: dict, content_changed: bool = True) -> bool:
     """
     Update existing session (updates both KV and memory)
     """
     # Update in memory
-    SESSIONS[session_code] = session_data
+    cache_session(session_code, session_data)
     # Update in KV
-    return store_session(session_code, session_data)
+    return store_session(session_code, session_data, content_changed)
 
 def delete_session(session_code: str) -> bool:
     """
@@ -253,7 +330,7 @@ def delete_session(session_code: str) -> bool:
             print(f"Γ£à Deleted session {session_code} from Vercel KV")
         
         if session_code in SESSIONS:
-            del SESSIONS[session_code]
+            forget_session_pack_codes(session_code, SESSIONS.pop(session_code))
             print(f"Γ£à Deleted session {session_code} from memory")
         
         return True
@@ -263,24 +340,66 @@ def delete_session(session_code: str) -> bool:
 
 def cleanup_expired_sessions():
     """
-    Remove expired sessions from in-memory cache
-    NOTE: Only used when KV is disabled. When KV is enabled, Redis handles TTL automatically.
-    """
-    if KV_ENABLED:
-        # KV handles TTL automatically, no cleanup needed
-        return
+    Remove expired sessions and pack codes from in-memory storage
     
+    With KV enabled Redis expires the stored copies itself, but this instance
+    still caches sessions (and their expiry heap and pack code index entries)
+    in memory, so the sweep runs in both modes to keep those bounded.
+    """
     current_time = time.time()
-    expired = [code for code, session in SESSIONS.items() 
-               if current_time - session.get('lastActivity', session['created_at']) > SESSION_TTL]
-    for code in expired:
-        del SESSIONS[code]
+    while SESSION_EXPIRY and SESSION_EXPIRY[0][0] < current_time:
+        _, code = heapq.heappop(SESSION_EXPIRY)
+        session = SESSIONS.get(code)
+        if session is None:
+            continue
+        expires_at = session_expires_at(session)
+        if expires_at < current_time:
+            forget_session_pack_codes(code, SESSIONS.pop(code))
+        else:
+            # Session saw activity since it was scheduled - check again later
+            heapq.heappush(SESSION_EXPIRY, (expires_at, code))
     
     # Also cleanup expired in-memory pack codes
-    expired_packs = [code for code, entry in PACK_CODES.items()
-                    if current_time > entry['expires_at']]
-    for code in expired_packs:
-        del PACK_CODES[code]
+    while PACK_CODE_EXPIRY and PACK_CODE_EXPIRY[0][0] < current_time:
+        _, code = heapq.heappop(PACK_CODE_EXPIRY)
+        entry = PACK_CODES.get(code)
+        if entry is not None and current_time > entry['expires_at']:
+            del PACK_CODES[code]
+
+def maybe_cleanup_expired_sessions():
+    """Run cleanup_expired_sessions at most once per CLEANUP_INTERVAL"""
+    global last_cleanup_at
+    current_time = time.time()
+    if current_time - last_cleanup_at >= CLEANUP_INTERVAL:
+        last_cleanup_at = current_time
+        cleanup_expired_sessions()
+
+# Bookkeeping fields rewritten on every poll (and the stored tag itself) - they
+# don't count as a session change
+SESSION_ETAG_IGNORED = ('lastActivity', 'updated_at', 'etag')
+
+def session_etag(session_data: dict) -> str:
+    """
+    Weak ETag derived from the session's content (minus bookkeeping timestamps)
+    
+    Hashing content rather than keeping a revision counter stays correct when
+    concurrent writers race on the same KV key - every content write stores the
+    tag alongside the content, so whatever was stored last is what the tag describes.
+    """
+    content = {k: v for k, v in session_data.items() if k not in SESSION_ETAG_IGNORED}
+    serialized = json.dumps(content, sort_keys=True, separators=(',', ':')).encode('ascii')
+    return f'W/"{hashlib.blake2b(serialized, digest_size=12).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (RFC 9110 weak comparison)"""
+    if not if_none_match:
+        return False
+    opaque_tag = etag.removeprefix('W/')
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == opaque_tag:
+            return True
+    return False
 
 def touch_session(session_code: str, player_id: str = None):
     """Update session's last activity timestamp"""
@@ -288,17 +407,173 @@ def touch_session(session_code: str, player_id: str = None):
     if session:
         session['lastActivity'] = time.time()
         session['updated_at'] = time.time()
-        update_session(session_code, session)
+        update_session(session_code, session, content_changed=False)
+
+# Pack templates used to build bundle configs. Generated configs share these
+# slot tuples (they serialize as JSON lists), so they must never be mutated.
+# Base standard pack (1 any budget, 14 budget budget)
+BASE_STANDARD_SLOTS = (
+    {'cardType': 'weighted', 'budget': 'any', 'bracket': 'any', 'count': 1},
+    {'cardType': 'weighted', 'budget': 'budget', 'bracket': 'any', 'count': 14}
+)
+
+# Base lands pack (15 lands)
+BASE_LANDS_SLOTS = (
+    {'cardType': 'lands', 'budget': 'any', 'bracket': 'any', 'count': 15},
+)
+
+# Budget upgraded pack (1 expensive, 11 any budget, 3 lands)
+BUDGET_UPGRADE_SLOTS = (
+    {'cardType': 'weighted', 'budget': 'expensive', 'bracket': 'any', 'count': 1},
+    {'cardType': 'weighted', 'budget': 'any', 'bracket': 'any', 'count': 11},
+    {'cardType': 'lands', 'budget': 'any', 'bracket': 'any', 'count': 3}
+)
+
+# Full expensive pack (12 expensive, 3 lands)
+FULL_EXPENSIVE_SLOTS = (
+    {'cardType': 'weighted', 'budget': 'expensive', 'bracket': 'any', 'count': 12},
+    {'cardType': 'lands', 'budget': 'any', 'bracket': 'any', 'count': 3}
+)
+
+# Special pack templates (keyed by a perk's effects.specialPack). The first slot
+# is copied per use since its count (and deckUrl) come from the perk.
+SPECIAL_PACK_TEMPLATES = {
+    'gamechanger': {
+        'name': 'Game Changer',
+        'count': 1,
+        'slots': [{'cardType': 'gamechangers', 'budget': 'any', 'bracket': 'any', 'count': 1}]
+    },
+    'high_synergy': {
+        'name': 'High Synergy Picks',
+        'count': 1,
+        'slots': [{'cardType': 'highsynergy', 'budget': 'any', 'bracket': 'any', 'count': 1}]
+    },
+    'conspiracy': {
+        'name': 'Conspiracy',
+        'source': 'scryfall',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'query': 'https://scryfall.com/search?q=%28t%3Aconspiracy+-is%3Aplaytest%29+OR+%28set%3Amb2+name%3A%22Marchesa%27s+Surprise+Party%22%29+OR+%28set%3Amb2+name%3A%22Rule+with+an+Even+Hand%22%29&unique=cards&as=grid&order=name',
+            'count': 1
+        }]
+    },
+    'banned': {
+        'name': 'Banned Card',
+        'source': 'moxfield',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'deckUrl': None,  # Will be filled from perk effect
+            'count': 1
+        }]
+    },
+    'test_cards': {
+        'name': 'Test Cards',
+        'source': 'moxfield',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'deckUrl': None,  # Will be filled from perk effect
+            'count': 1
+        }]
+    },
+    'silver_border_cards': {
+        'name': 'Silver-Border Cards',
+        'source': 'moxfield',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'deckUrl': None,  # Will be filled from perk effect
+            'count': 1
+        }]
+    },
+    'scangtech': {
+        'name': 'ScangTech Cards',
+        'source': 'moxfield',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'deckUrl': None,  # Will be filled from perk effect
+            'count': 1
+        }]
+    },
+    'jptech': {
+        'name': 'JpTech Cards',
+        'source': 'moxfield',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'deckUrl': None,  # Will be filled from perk effect
+            'count': 1
+        }]
+    },
+    'mdfc_lands': {
+        'name': 'MDFC Lands',
+        'source': 'scryfall',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'query': 'https://scryfall.com/search?q=is%3Amdfc+type%3Aland&unique=cards&as=grid&order=name',
+            'count': 1
+        }]
+    },
+    'any_cost_lands': {
+        'name': 'Any Cost Lands',
+        'source': 'edhrec',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'cardType': 'lands',
+            'budget': 'any',
+            'bracket': 'any',
+            'count': 1
+        }]
+    },
+    'expensive_lands': {
+        'name': 'Expensive Lands',
+        'source': 'edhrec',
+        'count': 1,
+        'useCommanderColorIdentity': True,
+        'slots': [{
+            'cardType': 'lands',
+            'budget': 'expensive',
+            'bracket': 'any',
+            'count': 1
+        }]
+    }
+}
+
 
 def cors_headers():
     """Return CORS headers for all responses"""
     return {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+        'Access-Control-Expose-Headers': 'ETag',
     }
 
 class handler(BaseHTTPRequestHandler):
+    # POST path -> (handler method, log line, error label). Routes with an error
+    # label report unexpected exceptions as a 500 instead of dropping the request.
+    POST_ROUTES = {
+        '': ('handle_create_session', "≡ƒÄ« [REQ-{request_id}] Creating new session", None),
+        '/create': ('handle_create_session', "≡ƒÄ« [REQ-{request_id}] Creating new session", None),
+        '/join': ('handle_join_session', "≡ƒæÑ [REQ-{request_id}] Joining session: {session_code}", None),
+        '/update-name': ('handle_update_name', "Γ£Å∩╕Å [REQ-{request_id}] Updating name in session: {session_code}", None),
+        '/roll-perks': ('handle_roll_perks', "≡ƒÄ▓ [REQ-{request_id}] Rolling perks for session: {session_code}", 'rolling perks'),
+        '/lock-commander': ('handle_lock_commander', "≡ƒöÆ [REQ-{request_id}] Locking commander in session: {session_code}", None),
+        '/update-commanders': ('handle_update_commanders', "ΓÜö∩╕Å [REQ-{request_id}] Updating commanders in session: {session_code}", None),
+        '/generate-pack-codes': ('handle_generate_pack_codes', "≡ƒôª [REQ-{request_id}] Generating pack codes for session: {session_code}", None),
+        '/rejoin': ('handle_rejoin_session', "≡ƒöä [REQ-{request_id}] Player rejoining session: {session_code}", None),
+        '/force-advance': ('handle_force_advance', "ΓÅ¡∩╕Å [REQ-{request_id}] Force advancing session: {session_code}", None),
+        '/heartbeat': ('handle_heartbeat', "≡ƒÆô [REQ-{request_id}] Heartbeat for session: {session_code}", None),
+        '/kick': ('handle_kick_player', "≡ƒæó [REQ-{request_id}] Kicking player from session: {session_code}", None),
+        '/mark-perks-seen': ('handle_mark_perks_seen', "≡ƒæü∩╕Å [REQ-{request_id}] Marking perks as seen for session: {session_code}", None),
+        '/test-perks': ('handle_test_perks', "≡ƒº¬ [REQ-{request_id}] Testing perks.json loading", None),
+    }
+    
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
@@ -313,92 +588,52 @@ class handler(BaseHTTPRequestHandler):
         request_start = time.time()
         request_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         
-        cleanup_expired_sessions()
+        maybe_cleanup_expired_sessions()
         
         # Parse request body
         content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length).decode('utf-8') if content_length > 0 else '{}'
+        if content_length > MAX_BODY_SIZE:
+            print(f"Γ¥î [REQ-{request_id}] Request body too large ({content_length} bytes)")
+            self.send_error_response(413, 'Request body too large')
+            return
+        # json.loads takes bytes directly, so there's no need to decode first
+        body = self.rfile.read(content_length) if content_length > 0 else b''
         
         print(f"≡ƒôÑ [REQ-{request_id}] POST {self.path} (body: {len(body)} bytes)")
         
         try:
             data = json.loads(body) if body else {}
             print(f"≡ƒôï [REQ-{request_id}] Parsed data keys: {list(data.keys())}")
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             print(f"Γ¥î [REQ-{request_id}] Invalid JSON in request body")
             self.send_error_response(400, 'Invalid JSON')
             return
 
         # Route based on path - handle both with and without /api/sessions prefix
-        path = self.path.split('?')[0]
-        
         # Strip /api/sessions prefix if present (Vercel might include it or not)
-        if path.startswith('/api/sessions'):
-            path = path[13:]  # Remove '/api/sessions'
+        path = self.path.split('?', 1)[0].removeprefix('/api/sessions')
         
         print(f"≡ƒ¢ñ∩╕Å [REQ-{request_id}] Routing to: {path}")
         
-        if path == '/create' or path == '':
-            print(f"≡ƒÄ« [REQ-{request_id}] Creating new session")
-            self.handle_create_session(data)
-        elif path == '/join':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒæÑ [REQ-{request_id}] Joining session: {session_code}")
-            self.handle_join_session(data)
-        elif path == '/update-name':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"Γ£Å∩╕Å [REQ-{request_id}] Updating name in session: {session_code}")
-            self.handle_update_name(data)
-        elif path == '/roll-perks':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒÄ▓ [REQ-{request_id}] Rolling perks for session: {session_code}")
-            try:
-                self.handle_roll_perks(data)
-            except Exception as e:
-                print(f"Γ¥î [REQ-{request_id}] Error in handle_roll_perks: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                self.send_error_response(500, f"Error rolling perks: {str(e)}")
-        elif path == '/lock-commander':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒöÆ [REQ-{request_id}] Locking commander in session: {session_code}")
-            self.handle_lock_commander(data)
-        elif path == '/update-commanders':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"ΓÜö∩╕Å [REQ-{request_id}] Updating commanders in session: {session_code}")
-            self.handle_update_commanders(data)
-        elif path == '/generate-pack-codes':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒôª [REQ-{request_id}] Generating pack codes for session: {session_code}")
-            self.handle_generate_pack_codes(data)
-        elif path == '/rejoin':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒöä [REQ-{request_id}] Player rejoining session: {session_code}")
-            self.handle_rejoin_session(data)
-        elif path == '/force-advance':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"ΓÅ¡∩╕Å [REQ-{request_id}] Force advancing session: {session_code}")
-            self.handle_force_advance(data)
-        elif path == '/heartbeat':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒÆô [REQ-{request_id}] Heartbeat for session: {session_code}")
-            self.handle_heartbeat(data)
-        elif path == '/kick':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒæó [REQ-{request_id}] Kicking player from session: {session_code}")
-            self.handle_kick_player(data)
-        elif path == '/mark-perks-seen':
-            session_code = data.get('sessionCode', 'UNKNOWN')
-            print(f"≡ƒæü∩╕Å [REQ-{request_id}] Marking perks as seen for session: {session_code}")
-            self.handle_mark_perks_seen(data)
-        elif path == '/test-perks':
-            print(f"≡ƒº¬ [REQ-{request_id}] Testing perks.json loading")
-            self.handle_test_perks()
-        else:
+        route = self.POST_ROUTES.get(path)
+        if route is None:
             print(f"Γ¥î [REQ-{request_id}] Invalid endpoint: {self.path}")
             self.send_error_response(404, f'Endpoint not found: {self.path}')
             return
         
+        method_name, log_line, error_label = route
+        print(log_line.format(request_id=request_id, session_code=data.get('sessionCode', 'UNKNOWN')))
+        handle = getattr(self, method_name)
+        if error_label is None:
+            handle(data)
+        else:
+            try:
+                handle(data)
+            except Exception as e:
+                print(f"Γ¥î [REQ-{request_id}] Error in {method_name}: {str(e)}")
+                traceback.print_exc()
+                self.send_error_response(500, f"Error {error_label}: {str(e)}")
+        
         elapsed = (time.time() - request_start) * 1000
         print(f"Γ£à [REQ-{request_id}] Completed in {elapsed:.1f}ms")
 
@@ -407,15 +642,14 @@ class handler(BaseHTTPRequestHandler):
         request_start = time.time()
         request_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         
-        cleanup_expired_sessions()
+        maybe_cleanup_expired_sessions()
         
-        path = self.path.split('?')[0]
+        path = self.path.split('?', 1)[0]
         
         print(f"≡ƒôÑ [REQ-{request_id}] GET {path}")
         
         # Strip /api/sessions prefix if present
-        if path.startswith('/api/sessions'):
-            path = path[13:]  # Remove '/api/sessions'
+        path = path.removeprefix('/api/sessions')
         
         # Get session by code: /sessions/{code} or /{code}
         if path.startswith('/pack/'):
@@ -783,7 +1017,6 @@ class handler(BaseHTTPRequestHandler):
                 
                 if commanders:
                     # Pick a random one from their generated list
-                    import random
                     selected_index = random.randint(0, len(commanders) - 1)
                     selected_commander = commanders[selected_index]
                     
@@ -855,6 +1088,8 @@ class handler(BaseHTTPRequestHandler):
         # Mark player as kicked (don't remove them - preserve their slot and data)
         player_to_kick['isKicked'] = True
         player_to_kick['kickedAt'] = time.time()
+        # Their slot stays, but their pack code no longer reserves a place in the index
+        forget_player_pack_code(session_code, player_to_kick)
         
         session['updated_at'] = time.time()
         update_session(session_code, session)
@@ -903,7 +1138,13 @@ class handler(BaseHTTPRequestHandler):
         
         # Touch session without specific player (will still check for disconnections)
         touch_session(session_code)
-        self.send_json_response(200, session)
+        
+        # Let polling clients revalidate cheaply - the tag only changes with the content
+        etag = session.get('etag') or session_etag(session)
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_not_modified(etag)
+            return
+        self.send_json_response(200, session, {'ETag': etag, 'Cache-Control': 'no-cache'})
 
     def handle_get_pack(self, pack_code):
         """Get pack configuration by pack code"""
@@ -915,55 +1156,49 @@ class handler(BaseHTTPRequestHandler):
             self.send_json_response(200, pack_data)
             return
         
-        # Fallback: search in active sessions (in-memory)
-        for session in SESSIONS.values():
-            for player in session['players']:
-                if player.get('packCode') == pack_code:
-                    # Return the pack config with commander URL and perks
-                    response = {
-                        'commanderUrl': player.get('commanderUrl', ''),
-                        'config': player.get('packConfig', {}),
-                        'perks': player.get('perksList', [])
-                    }
-                    self.send_json_response(200, response)
-                    return
+        # Fallback: find the owning in-memory session through the pack code index.
+        # Cached session dicts get replaced on reload, so resolve the player from
+        # the current session rather than holding player references.
+        session = SESSIONS.get(PACK_CODE_SESSIONS.get(pack_code))
+        if session:
+            player = next((p for p in session['players'] if p.get('packCode') == pack_code), None)
+            if player:
+                # Return the pack config with commander URL and perks
+                response = {
+                    'commanderUrl': player.get('commanderUrl', ''),
+                    'config': player.get('packConfig', {}),
+                    'perks': player.get('perksList', [])
+                }
+                self.send_json_response(200, response)
+                return
         
         self.send_error_response(404, 'Pack code not found or expired')
 
     def generate_pack_codes_internal(self, session):
         """Internal helper to generate pack codes and configs"""
-        # Load perks to get effects from single source of truth: docs/data/perks.json
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        perks_path = os.path.join(current_dir, '..', 'docs', 'data', 'perks.json')
-        
+        # Perk effects come from the single source of truth, docs/data/perks.json,
+        # parsed and flattened once per process by the perk roller
         try:
-            with open(perks_path, 'r', encoding='utf-8') as f:
-                perks_data = json.load(f)
-        except:
-            perks_data = {'perks': []}
-        
-        # Get all perks - support both formats
-        if 'perkTypes' in perks_data:
-            # V2 format - flatten perkTypes
-            all_perks = []
-            for ptype in perks_data.get('perkTypes', []):
-                all_perks.extend(ptype.get('perks', []))
-        else:
-            # V1 format - direct perks array
-            all_perks = perks_data.get('perks', [])
+            perks_by_id = get_perks_by_id()
+        except Exception as e:
+            print(f"Γ¥î Error loading perks.json: {e}")
+            perks_by_id = {}
         
         for player in session['players']:
+            # Release any code from an earlier generation for this player
+            forget_player_pack_code(session['sessionCode'], player)
+            
             # Generate unique pack code
             pack_code = generate_pack_code()
-            while any(p.get('packCode') == pack_code for s in SESSIONS.values() for p in s['players']):
+            while pack_code in PACK_CODE_SESSIONS:
                 pack_code = generate_pack_code()
+            PACK_CODE_SESSIONS[pack_code] = session['sessionCode']
             
             # Get all perk objects with full effects
             player_perks = []
             perk_display_list = []  # For TTS chat display (drafting perks only)
             for perk_ref in player.get('perks', []):
-                perk_full = next((p for p in all_perks if p['id'] == perk_ref['id']), None)
+                perk_full = perks_by_id.get(perk_ref['id'])
                 if perk_full:
                     player_perks.append(perk_full)
                     # Only add drafting perks to TTS display list
@@ -1048,129 +1283,6 @@ class handler(BaseHTTPRequestHandler):
         """Generate bundle config from combined perk effects"""
         bundle_config = {'packTypes': []}
         
-        # Base standard pack (1 any budget, 14 budget budget)
-        base_standard_pack = {
-            'slots': [
-                {'cardType': 'weighted', 'budget': 'any', 'bracket': 'any', 'count': 1},
-                {'cardType': 'weighted', 'budget': 'budget', 'bracket': 'any', 'count': 14}
-            ]
-        }
-        
-        # Base lands pack (15 lands)
-        base_lands_pack = {
-            'slots': [
-                {'cardType': 'lands', 'budget': 'any', 'bracket': 'any', 'count': 15}
-            ]
-        }
-        
-        # Special pack templates
-        special_pack_templates = {
-            'gamechanger': {
-                'name': 'Game Changer',
-                'count': 1,
-                'slots': [{'cardType': 'gamechangers', 'budget': 'any', 'bracket': 'any', 'count': 1}]
-            },
-            'high_synergy': {
-                'name': 'High Synergy Picks',
-                'count': 1,
-                'slots': [{'cardType': 'highsynergy', 'budget': 'any', 'bracket': 'any', 'count': 1}]
-            },
-            'conspiracy': {
-                'name': 'Conspiracy',
-                'source': 'scryfall',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'query': 'https://scryfall.com/search?q=%28t%3Aconspiracy+-is%3Aplaytest%29+OR+%28set%3Amb2+name%3A%22Marchesa%27s+Surprise+Party%22%29+OR+%28set%3Amb2+name%3A%22Rule+with+an+Even+Hand%22%29&unique=cards&as=grid&order=name',
-                    'count': 1
-                }]
-            },
-            'banned': {
-                'name': 'Banned Card',
-                'source': 'moxfield',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'deckUrl': None,  # Will be filled from perk effect
-                    'count': 1
-                }]
-            },
-            'test_cards': {
-                'name': 'Test Cards',
-                'source': 'moxfield',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'deckUrl': None,  # Will be filled from perk effect
-                    'count': 1
-                }]
-            },
-            'silver_border_cards': {
-                'name': 'Silver-Border Cards',
-                'source': 'moxfield',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'deckUrl': None,  # Will be filled from perk effect
-                    'count': 1
-                }]
-            },
-            'scangtech': {
-                'name': 'ScangTech Cards',
-                'source': 'moxfield',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'deckUrl': None,  # Will be filled from perk effect
-                    'count': 1
-                }]
-            },
-            'jptech': {
-                'name': 'JpTech Cards',
-                'source': 'moxfield',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'deckUrl': None,  # Will be filled from perk effect
-                    'count': 1
-                }]
-            },
-            'mdfc_lands': {
-                'name': 'MDFC Lands',
-                'source': 'scryfall',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'query': 'https://scryfall.com/search?q=is%3Amdfc+type%3Aland&unique=cards&as=grid&order=name',
-                    'count': 1
-                }]
-            },
-            'any_cost_lands': {
-                'name': 'Any Cost Lands',
-                'source': 'edhrec',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'cardType': 'lands',
-                    'budget': 'any',
-                    'bracket': 'any',
-                    'count': 1
-                }]
-            },
-            'expensive_lands': {
-                'name': 'Expensive Lands',
-                'source': 'edhrec',
-                'count': 1,
-                'useCommanderColorIdentity': True,
-                'slots': [{
-                    'cardType': 'lands',
-                    'budget': 'expensive',
-                    'bracket': 'any',
-                    'count': 1
-                }]
-            }
-        }
-        
         # Calculate base pack count
         base_pack_count = 5 + effects.get('packQuantity', 0)
         
@@ -1188,12 +1300,12 @@ class handler(BaseHTTPRequestHandler):
         
         # Add normal standard packs (card packs, not lands)
         if normal_packs > 0:
-            pack = {'count': normal_packs, 'slots': base_standard_pack['slots'].copy()}
+            pack = {'count': normal_packs, 'slots': BASE_STANDARD_SLOTS}
             bundle_config['packTypes'].append(pack)
         
         # Always add 1 lands pack (unless player has 0 packs total somehow)
         if base_pack_count > 0:
-            lands_pack = {'name': 'Lands', 'count': 1, 'slots': base_lands_pack['slots'].copy()}
+            lands_pack = {'name': 'Lands', 'count': 1, 'slots': BASE_LANDS_SLOTS}
             bundle_config['packTypes'].append(lands_pack)
         
         # Add budget upgraded packs
@@ -1201,11 +1313,7 @@ class handler(BaseHTTPRequestHandler):
             pack = {
                 'name': 'Budget Upgraded',
                 'count': budget_upgrade_packs,
-                'slots': [
-                    {'cardType': 'weighted', 'budget': 'expensive', 'bracket': 'any', 'count': 1},
-                    {'cardType': 'weighted', 'budget': 'any', 'bracket': 'any', 'count': 11},
-                    {'cardType': 'lands', 'budget': 'any', 'bracket': 'any', 'count': 3}
-                ]
+                'slots': BUDGET_UPGRADE_SLOTS
             }
             bundle_config['packTypes'].append(pack)
         
@@ -1214,10 +1322,7 @@ class handler(BaseHTTPRequestHandler):
             pack = {
                 'name': 'Full Expensive',
                 'count': full_expensive_packs,
-                'slots': [
-                    {'cardType': 'weighted', 'budget': 'expensive', 'bracket': 'any', 'count': 12},
-                    {'cardType': 'lands', 'budget': 'any', 'bracket': 'any', 'count': 3}
-                ]
+                'slots': FULL_EXPENSIVE_SLOTS
             }
             bundle_config['packTypes'].append(pack)
         
@@ -1240,25 +1345,27 @@ class handler(BaseHTTPRequestHandler):
             special_pack_count = special_pack_info['count']
             moxfield_deck = special_pack_info.get('moxfieldDeck')
             
-            if special_pack_type in special_pack_templates:
-                pack = json.loads(json.dumps(special_pack_templates[special_pack_type]))
+            template = SPECIAL_PACK_TEMPLATES.get(special_pack_type)
+            if template:
+                # Copy only what changes - the first slot; the rest is shared
+                first_slot = dict(template['slots'][0])
+                pack = dict(template)
+                pack['slots'] = [first_slot, *template['slots'][1:]]
                 
                 # Set the count for the slot
-                pack['slots'][0]['count'] = special_pack_count
+                first_slot['count'] = special_pack_count
                 
                 # If this pack needs a Moxfield deck URL, set it
-                if moxfield_deck and 'deckUrl' in pack['slots'][0]:
+                if moxfield_deck and 'deckUrl' in first_slot:
                     # Convert deck ID to full URL
-                    pack['slots'][0]['deckUrl'] = f"https://moxfield.com/decks/{moxfield_deck}"
+                    first_slot['deckUrl'] = f"https://moxfield.com/decks/{moxfield_deck}"
                 
                 bundle_config['packTypes'].append(pack)
         
         return bundle_config
 
-    def handle_test_perks(self):
+    def handle_test_perks(self, data=None):
         """Test endpoint to verify perks.json can be loaded"""
-        import os
-        
         result = {
             'cwd': os.getcwd(),
             'file_location': os.path.abspath(__file__),
@@ -1267,10 +1374,8 @@ class handler(BaseHTTPRequestHandler):
             'error': None
         }
         
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Single source of truth
-        perks_path = os.path.join(current_dir, '..', 'docs', 'data', 'perks.json')
+        # Single source of truth (deliberately re-read here to check the file on disk)
+        perks_path = PERKS_PATH
         result['perks_path'] = perks_path
         result['file_exists'] = os.path.exists(perks_path)
         
@@ -1285,14 +1390,29 @@ class handler(BaseHTTPRequestHandler):
         
         self.send_json_response(200, result)
 
-    def send_json_response(self, status_code, data):
-        """Send JSON response with CORS headers"""
+    def send_json_response(self, status_code, data, headers=None):
+        """Send JSON response with CORS headers (plus any extra headers)"""
+        # Compact separators keep the payload small (sessions are polled). ASCII escaping
+        # stays on: player-supplied strings can hold lone surrogates that UTF-8 can't encode.
+        body = json.dumps(data, separators=(',', ':')).encode('ascii')
         self.send_response(status_code)
-        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in cors_headers().items():
+            self.send_header(key, value)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_modified(self, etag):
+        """Send an empty 304 for a conditional GET whose ETag still matches"""
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
         for key, value in cors_headers().items():
             self.send_header(key, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
 
     def send_error_response(self, status_code, message):
         """Send error response"""
@@ -0,0 +1,148 @@
+"""
+Unit tests for the perk rolling system (api/perk_roller.py)
+Runs against the real docs/data/perks.json - no server or browser needed
+"""
+
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.perk_roller import PerkRoller, _build_alias, _alias_pick
+
+
+def make_session(num_players):
+    """Build a minimal session dict with the given number of players"""
+    return {
+        'hostId': 'p1',
+        'settings': {'perksCount': 3},
+        'players': [{'id': f'p{i + 1}', 'name': f'Player {i + 1}', 'perks': []} for i in range(num_players)]
+    }
+
+
+def test_alias_table_matches_weights():
+    """Alias sampling should reproduce the input weight distribution"""
+    weights = [44, 29, 17, 8]
+    prob, alias = _build_alias(weights)
+    table = (prob, alias, ['common', 'uncommon', 'rare', 'mythic'])
+
+    draws = 40000
+    counts = Counter(_alias_pick(table) for _ in range(draws))
+
+    for rarity, weight in zip(table[2], weights):
+        expected = weight / sum(weights)
+        assert abs(counts[rarity] / draws - expected) < 0.02, f"{rarity}: {counts[rarity] / draws:.3f} vs {expected:.3f}"
+
+
+def test_alias_table_zero_weights():
+    """Zero-weight entries are never drawn"""
+    prob, alias = _build_alias([0, 1, 0])
+    table = (prob, alias, ['a', 'b', 'c'])
+    assert {_alias_pick(table) for _ in range(500)} == {'b'}
+
+
+def test_preferred_rarity():
+    """Preferred rarity returns a perk of that rarity, or None when fallback is disallowed"""
+    roller = PerkRoller()
+
+    for rarity in ('common', 'uncommon', 'rare', 'mythic'):
+        assert roller.get_random_perk(preferred_rarity=rarity)['rarity'] == rarity
+
+    assert roller.get_random_perk(preferred_rarity='legendary', fallback_allowed=False) is None
+    assert roller.get_random_perk(preferred_rarity='legendary') is not None
+
+
+def test_unknown_rarity_fallback():
+    """An unknown rarity draws by weights only when fallback is allowed; otherwise None"""
+    roller = PerkRoller()
+    rng = random.Random(3)
+
+    assert all(roller.get_random_perk(preferred_rarity='legendary', fallback_allowed=False, rng=rng) is None
+               for _ in range(50))
+
+    fallback = Counter(roller.get_random_perk(preferred_rarity='legendary', rng=rng)['rarity'] for _ in range(2000))
+    assert set(fallback) == set(roller._rarities)
+
+
+def test_roll_perks_for_player():
+    """Rolling for a single player returns the requested count with unique types"""
+    roller = PerkRoller()
+
+    for _ in range(50):
+        perks, luck_target = roller.roll_perks_for_player('Tester', 3)
+        assert len(perks) == 3
+        assert luck_target > 0
+        assert len({roller.get_perk_type(p) for p in perks}) == 3
+
+
+def test_roll_perks_for_session():
+    """Session roll assigns every player perks_count perks"""
+    roller = PerkRoller()
+    session = roller.roll_perks_for_session(make_session(4), 3)
+
+    for player in session['players']:
+        assert len(player['perks']) == 3
+        assert len({p['id'] for p in player['perks']}) == 3
+        for perk in player['perks']:
+            assert set(perk) == {'id', 'name', 'rarity', 'description', 'perkPhase', 'effects'}
+
+
+def test_session_roll_is_reproducible_with_seeded_rng():
+    """Passing the same seeded rng yields the same perks"""
+    roller = PerkRoller()
+    first = roller.roll_perks_for_session(make_session(4), 3, rng=random.Random(7))
+    second = roller.roll_perks_for_session(make_session(4), 3, rng=random.Random(7))
+
+    assert [[p['id'] for p in pl['perks']] for pl in first['players']] == \
+        [[p['id'] for p in pl['perks']] for pl in second['players']]
+
+
+def test_session_luck_not_tied_to_player_order():
+    """The first player shouldn't always end up with the weakest combination"""
+    roller = PerkRoller()
+    first_not_lowest = 0
+
+    for _ in range(40):
+        session = roller.roll_perks_for_session(make_session(4), 3)
+        values = [sum(roller.rarity_values[p['rarity']] for p in pl['perks']) for pl in session['players']]
+        first_not_lowest += values[0] > min(values)
+
+    assert first_not_lowest > 0
+
+
+def test_rarity_multisets_match_rejection_reference():
+    """Multiset frequencies match rolling 44/29/17/8 rarities and rejecting out-of-tolerance rolls"""
+    roller = PerkRoller()
+    rarities = roller._rarities
+    weights = [roller._weights[r] for r in rarities]
+    values = [roller.rarity_values[r] for r in rarities]
+    perks_count, draws = 3, 15000
+    expected_total, std_dev, min_target, max_target, tolerance = roller._luck_constants(perks_count)
+
+    rng = random.Random(11)
+    sampled = Counter()
+    for _ in range(draws):
+        perks, _ = roller.roll_perks_for_player('Tester', perks_count, rng=rng)
+        counts = Counter(p['rarity'] for p in perks)
+        sampled[tuple(counts[r] for r in rarities)] += 1
+
+    # Reference: the rejection process the single-pass sampler replaces
+    rng = random.Random(12)
+    reference = Counter()
+    for _ in range(draws):
+        target = max(min_target, min(rng.gauss(expected_total, std_dev), max_target))
+        best, best_distance = None, float('inf')
+        for _ in range(perks_count * 100):
+            roll = rng.choices(range(len(rarities)), weights=weights, k=perks_count)
+            distance = abs(sum(values[i] for i in roll) - target)
+            if distance < best_distance:
+                best, best_distance = roll, distance
+            if distance <= tolerance:
+                break
+        counts = Counter(best)
+        reference[tuple(counts[i] for i in range(len(rarities)))] += 1
+
+    total_variation = sum(abs(sampled[c] - reference[c]) for c in set(sampled) | set(reference)) / (2 * draws)
+    assert total_variation < 0.05, f"total variation distance {total_variation:.3f}"
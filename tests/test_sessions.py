@@ -0,0 +1,207 @@
+"""
+Unit tests for in-memory session bookkeeping (api/sessions.py)
+Exercises the module directly - no server, KV or browser needed
+"""
+
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api.sessions as sessions
+
+
+def reset_storage():
+    """Clear all in-memory session and pack code state"""
+    sessions.SESSIONS.clear()
+    sessions.PACK_CODES.clear()
+    sessions.SESSION_EXPIRY.clear()
+    sessions.PACK_CODE_EXPIRY.clear()
+    sessions.PACK_CODE_SESSIONS.clear()
+
+
+def test_cleanup_expires_idle_sessions_only(monkeypatch):
+    """Idle sessions are dropped; sessions with recent activity survive and stay scheduled"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', False)
+    reset_storage()
+    stale = time.time() - sessions.SESSION_TTL - 5
+
+    sessions.cache_session('IDLE1', {'created_at': stale, 'lastActivity': stale})
+    sessions.cache_session('BUSY1', {'created_at': stale, 'lastActivity': stale})
+    sessions.cache_session('NEW01', {'created_at': time.time()})
+    sessions.SESSIONS['BUSY1']['lastActivity'] = time.time()
+
+    sessions.cleanup_expired_sessions()
+
+    assert set(sessions.SESSIONS) == {'BUSY1', 'NEW01'}
+    assert {code for _, code in sessions.SESSION_EXPIRY} == {'BUSY1', 'NEW01'}
+
+
+def test_expired_session_releases_pack_codes(monkeypatch):
+    """Pack codes of an expired session leave the uniqueness index"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', False)
+    reset_storage()
+    stale = time.time() - sessions.SESSION_TTL - 5
+
+    sessions.cache_session('IDLE1', {'created_at': stale, 'players': [{'packCode': 'PACKAAAA'}]})
+    sessions.cache_session('NEW01', {'created_at': time.time(), 'players': [{'packCode': 'PACKBBBB'}]})
+    sessions.PACK_CODE_SESSIONS.update({'PACKAAAA': 'IDLE1', 'PACKBBBB': 'NEW01'})
+
+    sessions.cleanup_expired_sessions()
+
+    assert sessions.PACK_CODE_SESSIONS == {'PACKBBBB': 'NEW01'}
+
+
+def test_kicked_player_releases_pack_code(monkeypatch):
+    """Kicking a player drops their pack code from the index, without touching codes other sessions own"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', False)
+    reset_storage()
+    players = [
+        {'id': 'host', 'packCode': 'PACKHOST'},
+        {'id': 'guest', 'packCode': 'PACKGST1'},
+    ]
+    sessions.cache_session('ABCDE', {'created_at': time.time(), 'hostId': 'host', 'players': players})
+    # Another session has since taken over the host's code
+    sessions.PACK_CODE_SESSIONS['PACKHOST'] = 'OTHER'
+
+    handler = sessions.handler.__new__(sessions.handler)
+    handler.send_json_response = lambda status, data, headers=None: None
+    handler.handle_kick_player({'sessionCode': 'ABCDE', 'playerId': 'host', 'kickPlayerId': 'guest'})
+
+    assert sessions.PACK_CODE_SESSIONS == {'PACKHOST': 'OTHER'}
+
+    sessions.delete_session('ABCDE')
+    assert sessions.PACK_CODE_SESSIONS == {'PACKHOST': 'OTHER'}
+
+
+def test_cleanup_expires_pack_codes(monkeypatch):
+    """Expired in-memory pack codes are removed"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', False)
+    reset_storage()
+
+    sessions.cache_pack_code('OLDPACK1', {})
+    sessions.cache_pack_code('NEWPACK1', {})
+    sessions.PACK_CODES['OLDPACK1']['expires_at'] = time.time() - 1
+    sessions.PACK_CODE_EXPIRY[:] = [(time.time() - 1, 'OLDPACK1'), (time.time() + 60, 'NEWPACK1')]
+
+    sessions.cleanup_expired_sessions()
+
+    assert set(sessions.PACK_CODES) == {'NEWPACK1'}
+
+
+def test_request_cleanup_is_throttled(monkeypatch):
+    """Request-triggered cleanup runs at most once per CLEANUP_INTERVAL"""
+    calls = []
+    monkeypatch.setattr(sessions, 'cleanup_expired_sessions', lambda: calls.append(1))
+    monkeypatch.setattr(sessions, 'last_cleanup_at', 0.0)
+
+    for _ in range(5):
+        sessions.maybe_cleanup_expired_sessions()
+
+    assert len(calls) == 1
+
+
+def test_oversized_post_body_is_rejected_unread():
+    """POST bodies over MAX_BODY_SIZE get a 413 without being read"""
+    handler = sessions.handler.__new__(sessions.handler)
+    handler.path = '/api/sessions/create'
+    handler.headers = {'Content-Length': str(sessions.MAX_BODY_SIZE + 1)}
+    handler.rfile = io.BytesIO(b'{}')
+    responses = []
+    handler.send_error_response = lambda status, message: responses.append(status)
+
+    handler.do_POST()
+
+    assert responses == [413]
+    assert handler.rfile.tell() == 0
+
+
+def test_session_get_revalidates_with_etag(monkeypatch):
+    """Polling with the current ETag gets a 304 until the session content changes"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', False)
+    reset_storage()
+    sessions.store_session('ABCDE', {'created_at': time.time(), 'players': []})
+
+    def get(etag=None):
+        handler = sessions.handler.__new__(sessions.handler)
+        handler.headers = {'If-None-Match': etag} if etag else {}
+        responses = []
+        handler.send_json_response = lambda status, data, headers=None: responses.append((status, headers))
+        handler.send_not_modified = lambda etag: responses.append((304, {'ETag': etag}))
+        handler.handle_get_session('ABCDE')
+        return responses[0]
+
+    status, headers = get()
+    etag = headers['ETag']
+    assert status == 200
+    assert get(etag)[0] == 304
+    assert get(etag.removeprefix('W/'))[0] == 304
+    assert get(f'W/"other", {etag}')[0] == 304
+    assert get('*')[0] == 304
+    assert get('W/"other"')[0] == 200
+
+    # Activity bookkeeping alone doesn't invalidate the cached copy
+    sessions.update_session('ABCDE', sessions.SESSIONS['ABCDE'])
+    assert get(etag)[0] == 304
+
+    # The tag is stored with the session at write time - GETs never rehash it
+    def no_rehash(session_data):
+        raise AssertionError('session re-hashed on GET')
+    with monkeypatch.context() as patch:
+        patch.setattr(sessions, 'session_etag', no_rehash)
+        assert get(etag)[0] == 304
+
+    # A racing writer storing its own copy changes the tag even though nothing
+    # counted its writes
+    sessions.update_session('ABCDE', dict(sessions.SESSIONS['ABCDE'], players=[{'id': 'p1'}]))
+    assert get(etag)[0] == 200
+
+
+def test_session_with_surrogate_name_still_serializes(monkeypatch):
+    """A lone surrogate in a player name can't break create or later GETs"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', False)
+    reset_storage()
+
+    def request(method, path, body=b''):
+        handler = sessions.handler.__new__(sessions.handler)
+        handler.path = path
+        handler.headers = {'Content-Length': str(len(body))}
+        handler.rfile = io.BytesIO(body)
+        handler.wfile = io.BytesIO()
+        statuses = []
+        handler.send_response = statuses.append
+        handler.send_header = lambda key, value: None
+        handler.end_headers = lambda: None
+        getattr(handler, 'do_' + method)()
+        return statuses[0], json.loads(handler.wfile.getvalue())
+
+    status, created = request('POST', '/create', b'{"playerName": "\\ud800x"}')
+    assert status == 200
+    assert created['sessionData']['players'][0]['name'] == '\ud800x'
+
+    status, session = request('GET', '/' + created['sessionCode'])
+    assert status == 200
+    assert session['players'][0]['name'] == '\ud800x'
+
+
+def test_cleanup_prunes_memory_indexes_with_kv_enabled(monkeypatch):
+    """KV deployments still cache sessions locally, so the sweep must bound those too"""
+    monkeypatch.setattr(sessions, 'KV_ENABLED', True)
+    reset_storage()
+    stale = time.time() - sessions.SESSION_TTL - 5
+
+    sessions.cache_session('IDLE1', {'created_at': stale, 'players': [{'packCode': 'PACKAAAA'}]})
+    sessions.cache_pack_code('OLDPACK1', {})
+    sessions.PACK_CODES['OLDPACK1']['expires_at'] = time.time() - 1
+    sessions.PACK_CODE_EXPIRY[:] = [(time.time() - 1, 'OLDPACK1')]
+
+    sessions.cleanup_expired_sessions()
+
+    assert not sessions.SESSIONS
+    assert not sessions.SESSION_EXPIRY
+    assert not sessions.PACK_CODE_SESSIONS
+    assert not sessions.PACK_CODES
+    assert not sessions.PACK_CODE_EXPIRY